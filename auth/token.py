@@ -1,25 +1,22 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from motor.motor_asyncio import AsyncIOMotorClient
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from repositories.base import BlacklistRepository
+from repositories.providers import get_blacklist_repository
 import os
 import time
+import logging
 
 # === Setup ===
 load_dotenv()
+logger = logging.getLogger(__name__)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# === MongoDB ===
-MONGO_URI = os.getenv("MONGO_URI")
-client = AsyncIOMotorClient(MONGO_URI)
-db = client.fastAPI
-blacklist_collection = db.blacklist
-
 # === Security Setup ===
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer()
@@ -39,10 +36,13 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+async def verify_token(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    blacklist: BlacklistRepository = Depends(get_blacklist_repository)
+):
     token = credentials.credentials
 
-    if await blacklist_collection.find_one({"token": token}):
+    if await blacklist.contains(token):
         raise HTTPException(status_code=401, detail="Token tidak valid (sudah logout)")
 
     try:
@@ -70,6 +70,11 @@ async def get_verified_user(user: dict = Depends(get_current_user)):
         )
     return user
 
+async def require_admin(user: dict = Depends(get_verified_user)):
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Hanya admin yang boleh mengakses ini.")
+    return user
+
 # === Token untuk Verifikasi Email ===
 
 def create_email_verification_token(email: str, expires_delta: timedelta = timedelta(days=1)):
@@ -89,7 +94,7 @@ def verify_email_token(token: str):
             raise HTTPException(status_code=400, detail="Token tidak valid untuk verifikasi email")
         return payload.get("sub")
     except JWTError as e:
-        print("❌ JWT ERROR:", e)
+        logger.info("Token verifikasi email ditolak: %s", e)
         raise HTTPException(status_code=400, detail="Token verifikasi email tidak valid atau kadaluarsa")
 
 # === Token untuk Reset Password ===
@@ -111,7 +116,7 @@ def verify_reset_password_token(token: str):
             raise HTTPException(status_code=400, detail="Token tidak valid untuk reset password")
         return payload.get("sub")
     except JWTError as e:
-        print("❌ JWT ERROR:", e)
+        logger.info("Token reset password ditolak: %s", e)
         raise HTTPException(status_code=400, detail="Token reset password tidak valid atau kadaluarsa")
 
 # === Token Verifikasi Umum dari String (misalnya dari URL query param) ===
@@ -14,3 +14,6 @@ blacklist_collection = db.blacklist
 
 fakultas_collection = db.fakultas
 prodi_collection = db.prodi
+
+audit_collection = db.audit_log
+idempotency_collection = db.idempotency_keys
@@ -1,14 +1,74 @@
 # File: main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
-from database import db
-from routes import user_routes, fakultas_routes, prodi_routes
+import asyncio
+from database import db, users_collection
+from routes import user_routes, fakultas_routes, prodi_routes, metrics_routes
+from repositories.providers import REPOSITORY_BACKEND
+from utils.audit import audit_bus
+from utils.user_search import ensure_user_indexes, backfill_normalized_fields
+from utils.compression import CompressionMiddleware
+from utils.scheduler import scheduler, SCHEDULER_ENABLED
+from utils.maintenance import ensure_maintenance_indexes
+from utils.idempotency import IdempotencyMiddleware, ensure_idempotency_indexes
+from utils.logging_config import (
+    setup_logging,
+    shutdown_logging,
+    RequestIdMiddleware
+)
+from utils.loop_monitor import loop_monitor, ProfilerMiddleware, LOOP_MONITOR_ENABLED, PROFILER_ENABLED
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+# Log JSON lewat QueueHandler/QueueListener: I/O di thread terpisah, bukan di event loop
+setup_logging()
+
+USES_MONGO = REPOSITORY_BACKEND == "mongo"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No-op saat pertama kali; menyalakan lagi logging setelah siklus lifespan sebelumnya
+    setup_logging()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.register_routes(app)
+        await loop_monitor.start()
+    # Backend memory (test/benchmark) berjalan tanpa MongoDB sama sekali
+    if USES_MONGO:
+        await audit_bus.ensure_collection()
+        await audit_bus.start()
+        await ensure_user_indexes(users_collection)
+        await ensure_idempotency_indexes()
+        backfill_task = asyncio.create_task(backfill_normalized_fields(users_collection))
+        if SCHEDULER_ENABLED:
+            await ensure_maintenance_indexes()
+            await scheduler.start()
+    yield
+    if USES_MONGO:
+        await scheduler.stop()
+        backfill_task.cancel()
+        # Flush sisa audit event sebelum proses berhenti
+        await audit_bus.stop()
+    await loop_monitor.stop()
+    # Terakhir: log dari shutdown di atas masih ikut ditulis
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+# Diagnosa: profil request admin dengan ?profile=1 / X-Profile: 1
+if PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Replay response POST untuk retry dengan Idempotency-Key yang sama.
+# Ditambahkan sebelum kompresi supaya yang disimpan adalah body mentah.
+if USES_MONGO:
+    app.add_middleware(IdempotencyMiddleware)
+# Kompresi gzip/brotli/zstd sesuai Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+# Paling luar: request ID tersedia untuk semua log di bawahnya
+app.add_middleware(RequestIdMiddleware)
 
 # MongoDB setup (already done in database.py)
 
@@ -16,6 +76,7 @@ app = FastAPI()
 app.include_router(user_routes.router, prefix="/users", tags=["Users"])
 app.include_router(fakultas_routes.router, prefix="/fakultas", tags=["Fakultas"])
 app.include_router(prodi_routes.router, prefix="/prodi", tags=["Prodi"])
+app.include_router(metrics_routes.router, prefix="/metrics", tags=["Metrics"])
 
 # Optional: Root endpoint
 @app.get("/")
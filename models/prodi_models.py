@@ -29,6 +29,7 @@ class ProdiOut(BaseModel):
     id: str = Field(..., alias="_id")
     nama_prodi: str
     fakultas_id: str
+    fakultas_nama: Optional[str] = None
 
     class Config:
         allow_population_by_field_name = True
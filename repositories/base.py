@@ -0,0 +1,114 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+# Semua repository bekerja dengan dokumen dict bergaya MongoDB (field "_id"
+# berupa ObjectId) supaya route tidak perlu tahu backend mana yang dipakai.
+# Dokumen yang dikembalikan selalu salinan; route bebas memodifikasinya.
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get_by_id(self, user_id) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_by_login(self, identifier: str) -> Optional[dict]:
+        """Cari user berdasarkan email atau username."""
+
+    @abstractmethod
+    async def get_by_verification_token(self, token: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def insert(self, user: dict):
+        """Simpan user baru, kembalikan ``_id``."""
+
+    @abstractmethod
+    async def update(self, user_id, values: dict, unset: List[str] = ()) -> Tuple[int, int]:
+        """``$set``/``$unset`` satu user, kembalikan ``(matched, modified)``."""
+
+    @abstractmethod
+    async def update_by_email(self, email: str, values: dict) -> int:
+        """``$set`` user dengan email tertentu, kembalikan jumlah yang berubah."""
+
+    @abstractmethod
+    async def request_email_change(self, user_id, new_email: str, token: str, requested_at) -> int:
+        """Tandai email baru yang menunggu verifikasi.
+
+        Status ``is_verified`` sebelumnya disimpan di ``pending_email_prev_verified``
+        (hanya untuk permintaan pertama) agar bisa dipulihkan job maintenance.
+        """
+
+    @abstractmethod
+    async def delete(self, user_id) -> int: ...
+
+    @abstractmethod
+    async def search(
+        self,
+        username: str = None,
+        email: str = None,
+        role: str = None,
+        username_prefix: str = None,
+        email_prefix: str = None,
+        q: str = None,
+        sort_by: str = None,
+        sort_order: int = 1,
+        skip: int = 0,
+        limit: int = 10,
+    ) -> Tuple[int, List[dict]]:
+        """Pencarian admin, kembalikan ``(total, halaman_dokumen)``."""
+
+
+class FakultasRepository(ABC):
+    @abstractmethod
+    async def list_all(self) -> List[dict]: ...
+
+    @abstractmethod
+    async def get(self, fakultas_id) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_nama(self, fakultas_id) -> Optional[str]:
+        """Nama fakultas, atau ``None`` kalau fakultas tidak ada."""
+
+    @abstractmethod
+    async def insert(self, fakultas: dict):
+        """Simpan fakultas baru, kembalikan ``_id``."""
+
+    @abstractmethod
+    async def update(self, fakultas_id, values: dict) -> int:
+        """Update fakultas dan propagasikan nama baru ke ``fakultas_nama`` prodi.
+
+        Kembalikan jumlah fakultas yang cocok (0 atau 1).
+        """
+
+    @abstractmethod
+    async def delete(self, fakultas_id) -> int:
+        """Hapus fakultas dan buang ``fakultas_nama`` dari prodi yang ditinggalkannya."""
+
+
+class ProdiRepository(ABC):
+    @abstractmethod
+    async def list_all(self) -> List[dict]: ...
+
+    @abstractmethod
+    async def get(self, prodi_id) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def insert(self, prodi: dict):
+        """Simpan prodi baru, kembalikan ``_id``."""
+
+    @abstractmethod
+    async def update(self, prodi_id, values: dict) -> int:
+        """Kembalikan jumlah prodi yang berubah."""
+
+    @abstractmethod
+    async def delete(self, prodi_id) -> int: ...
+
+
+class BlacklistRepository(ABC):
+    @abstractmethod
+    async def contains(self, token: str) -> bool: ...
+
+    @abstractmethod
+    async def add(self, token: str) -> None: ...
@@ -0,0 +1,296 @@
+import copy
+import re
+from collections import defaultdict
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from repositories.base import (
+    BlacklistRepository,
+    FakultasRepository,
+    ProdiRepository,
+    UserRepository,
+)
+from utils.user_search import resolve_user_search, with_normalized_fields
+
+_WORD = re.compile(r"\w+")
+
+
+class _Table:
+    """Penyimpanan dokumen in-memory dengan index hash per field.
+
+    Lookup equality lewat field ter-index O(1); field ``unique`` menolak
+    duplikat dengan ``DuplicateKeyError`` seperti unique index MongoDB.
+    """
+
+    def __init__(self, indexes=(), unique=()):
+        self.docs = {}
+        self.unique = set(unique)
+        self.indexes = {field: defaultdict(set) for field in (*indexes, *unique)}
+
+    def _index(self, doc, add: bool):
+        for field, index in self.indexes.items():
+            if field not in doc:
+                continue
+            ids = index[doc[field]]
+            if add:
+                ids.add(doc["_id"])
+            else:
+                ids.discard(doc["_id"])
+                if not ids:
+                    del index[doc[field]]
+
+    def _check_unique(self, doc):
+        for field in self.unique:
+            if field in doc and self.indexes[field].get(doc[field], set()) - {doc["_id"]}:
+                raise DuplicateKeyError(f"Duplikat {field}: {doc[field]!r}")
+
+    def lookup(self, field, value):
+        if field == "_id":
+            doc = self.docs.get(value)
+            return [doc] if doc is not None else []
+        if field in self.indexes:
+            return [self.docs[_id] for _id in self.indexes[field].get(value, ())]
+        return [doc for doc in self.docs.values() if doc.get(field) == value]
+
+    def find_one(self, field, value):
+        docs = self.lookup(field, value)
+        return copy.deepcopy(docs[0]) if docs else None
+
+    def insert(self, doc):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"Duplikat _id: {doc['_id']!r}")
+        self._check_unique(doc)
+        self.docs[doc["_id"]] = doc
+        self._index(doc, add=True)
+        return doc["_id"]
+
+    def update(self, _id, values: dict, unset=()) -> int:
+        # Kembalikan 1 kalau dokumen berubah, 0 kalau tidak (mirip modified_count)
+        old = self.docs[_id]
+        new = copy.deepcopy(old)
+        new.update(copy.deepcopy(values))
+        for field in unset:
+            new.pop(field, None)
+        if new == old:
+            return 0
+        self._check_unique(new)
+        self._index(old, add=False)
+        self.docs[_id] = new
+        self._index(new, add=True)
+        return 1
+
+    def delete(self, _id) -> int:
+        doc = self.docs.pop(_id, None)
+        if doc is None:
+            return 0
+        self._index(doc, add=False)
+        return 1
+
+    def all(self):
+        return [copy.deepcopy(doc) for doc in self.docs.values()]
+
+
+def _object_id(value):
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self):
+        self.table = _Table(indexes=(
+            "email", "username", "email_lower", "username_lower", "role", "email_verification_token"
+        ))
+
+    async def get_by_id(self, user_id):
+        try:
+            return self.table.find_one("_id", _object_id(user_id))
+        except Exception:
+            return None
+
+    async def get_by_email(self, email):
+        return self.table.find_one("email", email)
+
+    async def get_by_login(self, identifier):
+        return self.table.find_one("email", identifier) or self.table.find_one("username", identifier)
+
+    async def get_by_verification_token(self, token):
+        return self.table.find_one("email_verification_token", token)
+
+    async def insert(self, user):
+        return self.table.insert(user)
+
+    async def update(self, user_id, values, unset=()):
+        user_id = _object_id(user_id)
+        if user_id not in self.table.docs:
+            return 0, 0
+        return 1, self.table.update(user_id, values or {}, unset)
+
+    async def update_by_email(self, email, values):
+        docs = self.table.lookup("email", email)
+        if not docs:
+            return 0
+        return self.table.update(docs[0]["_id"], values)
+
+    async def request_email_change(self, user_id, new_email, token, requested_at):
+        user_id = _object_id(user_id)
+        user = self.table.docs.get(user_id)
+        if user is None:
+            return 0
+        prev_verified = user.get("pending_email_prev_verified")
+        if prev_verified is None:
+            prev_verified = user.get("is_verified")
+        return self.table.update(user_id, {
+            "pending_email_prev_verified": prev_verified,
+            "is_verified": False,
+            "pending_email": new_email,
+            "email_verification_token": token,
+            "email_change_requested_at": requested_at
+        })
+
+    async def delete(self, user_id):
+        return self.table.delete(_object_id(user_id))
+
+    async def search(
+        self, username=None, email=None, role=None, username_prefix=None, email_prefix=None,
+        q=None, sort_by=None, sort_order=1, skip=0, limit=10
+    ):
+        # Validasi dan default sort sama dengan backend MongoDB
+        params = resolve_user_search(
+            username=username,
+            email=email,
+            role=role,
+            username_prefix=username_prefix,
+            email_prefix=email_prefix,
+            q=q,
+            sort_by=sort_by,
+            skip=skip
+        )
+        username_prefix = params["username_prefix"]
+        email_prefix = params["email_prefix"]
+        sort_by = params["sort_by"]
+
+        # Mulai dari index yang paling selektif, sisanya difilter di Python
+        if username:
+            candidates = self.table.lookup("username", username)
+        elif email:
+            candidates = self.table.lookup("email", email)
+        elif role:
+            candidates = self.table.lookup("role", role)
+        else:
+            candidates = list(self.table.docs.values())
+
+        def lower(doc, field):
+            return doc.get(f"{field}_lower") or with_normalized_fields(
+                {field: doc.get(field)}
+            ).get(f"{field}_lower", "")
+
+        terms = {t.lower() for t in _WORD.findall(q)} if q else set()
+        scores = {}
+        matched = []
+        for doc in candidates:
+            if role and doc.get("role") != role:
+                continue
+            if username and doc.get("username") != username:
+                continue
+            if email and doc.get("email") != email:
+                continue
+            if username_prefix and not lower(doc, "username").startswith(username_prefix.lower()):
+                continue
+            if email_prefix and not lower(doc, "email").startswith(email_prefix.lower()):
+                continue
+            if terms:
+                words = set(_WORD.findall(f"{lower(doc, 'username')} {lower(doc, 'email')}"))
+                score = len(terms & words)
+                if not score:
+                    continue
+                scores[doc["_id"]] = score
+            matched.append(doc)
+
+        if terms:
+            matched.sort(key=lambda doc: (-scores[doc["_id"]], doc["_id"]))
+        elif sort_by is not None:
+            if sort_by == "created":
+                key = lambda doc: doc["_id"]
+            else:
+                key = lambda doc: (lower(doc, sort_by), doc["_id"])
+            matched.sort(key=key, reverse=sort_order == -1)
+
+        page = matched[skip:skip + limit] if limit else matched[skip:]
+        return len(matched), [copy.deepcopy(doc) for doc in page]
+
+
+class MemoryProdiRepository(ProdiRepository):
+    def __init__(self):
+        self.table = _Table(indexes=("fakultas_id",))
+
+    async def list_all(self):
+        return self.table.all()
+
+    async def get(self, prodi_id):
+        return self.table.find_one("_id", _object_id(prodi_id))
+
+    async def insert(self, prodi):
+        return self.table.insert(prodi)
+
+    async def update(self, prodi_id, values):
+        prodi_id = _object_id(prodi_id)
+        if prodi_id not in self.table.docs:
+            return 0
+        return self.table.update(prodi_id, values)
+
+    async def delete(self, prodi_id):
+        return self.table.delete(_object_id(prodi_id))
+
+
+class MemoryFakultasRepository(FakultasRepository):
+    def __init__(self, prodi_repository: MemoryProdiRepository):
+        self.table = _Table()
+        self.prodi_repository = prodi_repository
+
+    async def list_all(self):
+        return self.table.all()
+
+    async def get(self, fakultas_id):
+        return self.table.find_one("_id", _object_id(fakultas_id))
+
+    async def get_nama(self, fakultas_id):
+        fakultas = self.table.docs.get(_object_id(fakultas_id))
+        return fakultas["nama"] if fakultas else None
+
+    async def insert(self, fakultas):
+        return self.table.insert(fakultas)
+
+    async def update(self, fakultas_id, values):
+        fakultas_id = _object_id(fakultas_id)
+        if fakultas_id not in self.table.docs:
+            return 0
+        self.table.update(fakultas_id, values)
+        # Tanpa await di antara kedua update, jadi tetap atomik di event loop
+        if "nama" in values:
+            prodi_table = self.prodi_repository.table
+            for prodi in prodi_table.lookup("fakultas_id", fakultas_id):
+                prodi_table.update(prodi["_id"], {"fakultas_nama": values["nama"]})
+        return 1
+
+    async def delete(self, fakultas_id):
+        fakultas_id = _object_id(fakultas_id)
+        deleted = self.table.delete(fakultas_id)
+        if deleted:
+            prodi_table = self.prodi_repository.table
+            for prodi in prodi_table.lookup("fakultas_id", fakultas_id):
+                prodi_table.update(prodi["_id"], {}, unset=("fakultas_nama",))
+        return deleted
+
+
+class MemoryBlacklistRepository(BlacklistRepository):
+    def __init__(self):
+        self.table = _Table(unique=("token",))
+
+    async def contains(self, token):
+        return bool(self.table.lookup("token", token))
+
+    async def add(self, token):
+        if not self.table.lookup("token", token):
+            self.table.insert({"token": token})
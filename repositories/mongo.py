@@ -0,0 +1,222 @@
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from repositories.base import (
+    BlacklistRepository,
+    FakultasRepository,
+    ProdiRepository,
+    UserRepository,
+)
+from utils.singleflight import coalesced_find, coalesced_find_one, singleflight
+from utils.user_search import build_user_search
+
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get_by_id(self, user_id):
+        try:
+            return await self.collection.find_one({"_id": ObjectId(user_id)})
+        except Exception:
+            return None
+
+    async def get_by_email(self, email):
+        return await self.collection.find_one({"email": email})
+
+    async def get_by_login(self, identifier):
+        return await self.collection.find_one({
+            "$or": [
+                {"email": identifier},
+                {"username": identifier}
+            ]
+        })
+
+    async def get_by_verification_token(self, token):
+        return await self.collection.find_one({"email_verification_token": token})
+
+    async def insert(self, user):
+        result = await self.collection.insert_one(user)
+        return result.inserted_id
+
+    async def update(self, user_id, values, unset=()):
+        update = {}
+        if values:
+            update["$set"] = values
+        if unset:
+            update["$unset"] = {field: "" for field in unset}
+        result = await self.collection.update_one({"_id": ObjectId(user_id)}, update)
+        return result.matched_count, result.modified_count
+
+    async def update_by_email(self, email, values):
+        result = await self.collection.update_one({"email": email}, {"$set": values})
+        return result.modified_count
+
+    async def request_email_change(self, user_id, new_email, token, requested_at):
+        # Pipeline supaya status verifikasi sebelumnya dibaca dari dokumen itu sendiri.
+        # Nilai dari user dibungkus $literal: di pipeline, string berawalan "$"
+        # (mis. "$where@example.com") akan dibaca sebagai field path.
+        result = await self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            [
+                {
+                    "$set": {
+                        "pending_email_prev_verified": {"$ifNull": ["$pending_email_prev_verified", "$is_verified"]},
+                        "is_verified": False,
+                        "pending_email": {"$literal": new_email},
+                        "email_verification_token": {"$literal": token},
+                        "email_change_requested_at": {"$literal": requested_at}
+                    }
+                }
+            ]
+        )
+        return result.modified_count
+
+    async def delete(self, user_id):
+        result = await self.collection.delete_one({"_id": ObjectId(user_id)})
+        return result.deleted_count
+
+    async def search(
+        self, username=None, email=None, role=None, username_prefix=None, email_prefix=None,
+        q=None, sort_by=None, sort_order=1, skip=0, limit=10
+    ):
+        query, projection, sort = build_user_search(
+            username=username,
+            email=email,
+            role=role,
+            username_prefix=username_prefix,
+            email_prefix=email_prefix,
+            q=q,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            skip=skip
+        )
+
+        if query:
+            total = await self.collection.count_documents(query)
+        else:
+            # count_documents({}) men-scan seluruh koleksi; metadata cukup untuk total tanpa filter
+            total = await self.collection.estimated_document_count()
+
+        cursor = self.collection.find(query, projection).skip(skip).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        # Cursor sudah di-limit; length=limit akan mengembalikan [] untuk limit=0 (tanpa batas)
+        return total, await cursor.to_list(length=None)
+
+
+class MongoFakultasRepository(FakultasRepository):
+    def __init__(self, collection, prodi_collection, client):
+        self.collection = collection
+        self.prodi_collection = prodi_collection
+        self.client = client
+        # MongoDB standalone tidak mendukung transaksi; begitu ketahuan, langsung pakai jalur biasa
+        self.transactions_supported = True
+
+    async def list_all(self):
+        return await coalesced_find(self.collection)
+
+    async def get(self, fakultas_id):
+        return await coalesced_find_one(self.collection, {"_id": ObjectId(fakultas_id)})
+
+    async def get_nama(self, fakultas_id):
+        fakultas = await self.collection.find_one({"_id": ObjectId(fakultas_id)}, {"nama": 1})
+        return fakultas["nama"] if fakultas else None
+
+    async def insert(self, fakultas):
+        result = await self.collection.insert_one(fakultas)
+        singleflight.invalidate(self.collection.name)
+        return result.inserted_id
+
+    async def _write(self, apply):
+        # Jalankan apply(session) dalam satu transaksi. Tanpa replica set,
+        # apply() dijalankan tanpa session dan job check_prodi_fakultas_nama
+        # memperbaiki sisa inkonsistensi.
+        try:
+            if self.transactions_supported:
+                try:
+                    async with await self.client.start_session() as session:
+                        # with_transaction mengulang apply untuk TransientTransactionError
+                        # (mis. WriteConflict dengan update prodi bersamaan) dan commit
+                        # yang hasilnya tidak diketahui, bukan langsung jadi 500.
+                        return await session.with_transaction(apply)
+                except OperationFailure as e:
+                    # 20 = IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+                    if e.code != 20:
+                        raise
+                    self.transactions_supported = False
+            return await apply()
+        finally:
+            singleflight.invalidate(self.collection.name)
+            singleflight.invalidate(self.prodi_collection.name)
+
+    async def update(self, fakultas_id, values):
+        # Update fakultas dan snapshot fakultas_nama di prodi bersama-sama
+        fakultas_id = ObjectId(fakultas_id)
+
+        async def _apply(session=None):
+            result = await self.collection.update_one(
+                {"_id": fakultas_id}, {"$set": values}, session=session
+            )
+            if result.matched_count and "nama" in values:
+                await self.prodi_collection.update_many(
+                    {"fakultas_id": fakultas_id, "fakultas_nama": {"$ne": values["nama"]}},
+                    {"$set": {"fakultas_nama": values["nama"]}},
+                    session=session
+                )
+            return result.matched_count
+
+        return await self._write(_apply)
+
+    async def delete(self, fakultas_id):
+        # Prodi yang ditinggal tidak boleh tetap menampilkan nama fakultas yang sudah dihapus
+        fakultas_id = ObjectId(fakultas_id)
+
+        async def _apply(session=None):
+            result = await self.collection.delete_one({"_id": fakultas_id}, session=session)
+            if result.deleted_count:
+                await self.prodi_collection.update_many(
+                    {"fakultas_id": fakultas_id, "fakultas_nama": {"$exists": True}},
+                    {"$unset": {"fakultas_nama": ""}},
+                    session=session
+                )
+            return result.deleted_count
+
+        return await self._write(_apply)
+
+
+class MongoProdiRepository(ProdiRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def list_all(self):
+        return await coalesced_find(self.collection)
+
+    async def get(self, prodi_id):
+        return await coalesced_find_one(self.collection, {"_id": ObjectId(prodi_id)})
+
+    async def insert(self, prodi):
+        result = await self.collection.insert_one(prodi)
+        singleflight.invalidate(self.collection.name)
+        return result.inserted_id
+
+    async def update(self, prodi_id, values):
+        result = await self.collection.update_one({"_id": ObjectId(prodi_id)}, {"$set": values})
+        singleflight.invalidate(self.collection.name)
+        return result.modified_count
+
+    async def delete(self, prodi_id):
+        result = await self.collection.delete_one({"_id": ObjectId(prodi_id)})
+        singleflight.invalidate(self.collection.name)
+        return result.deleted_count
+
+
+class MongoBlacklistRepository(BlacklistRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def contains(self, token):
+        return await self.collection.find_one({"token": token}, {"_id": 1}) is not None
+
+    async def add(self, token):
+        await self.collection.insert_one({"token": token})
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+
+# === Konfigurasi ===
+# "mongo" (default) atau "memory" (tanpa MongoDB, untuk test dan benchmark)
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "mongo").lower()
+
+
+@lru_cache(maxsize=None)
+def _repositories(backend: str = REPOSITORY_BACKEND) -> dict:
+    # Import di dalam fungsi supaya backend memory tidak butuh koneksi MongoDB
+    if backend == "memory":
+        from repositories.memory import (
+            MemoryBlacklistRepository,
+            MemoryFakultasRepository,
+            MemoryProdiRepository,
+            MemoryUserRepository,
+        )
+        prodi = MemoryProdiRepository()
+        return {
+            "users": MemoryUserRepository(),
+            "fakultas": MemoryFakultasRepository(prodi),
+            "prodi": prodi,
+            "blacklist": MemoryBlacklistRepository(),
+        }
+
+    if backend == "mongo":
+        from database import (
+            blacklist_collection,
+            client,
+            fakultas_collection,
+            prodi_collection,
+            users_collection,
+        )
+        from repositories.mongo import (
+            MongoBlacklistRepository,
+            MongoFakultasRepository,
+            MongoProdiRepository,
+            MongoUserRepository,
+        )
+        return {
+            "users": MongoUserRepository(users_collection),
+            "fakultas": MongoFakultasRepository(fakultas_collection, prodi_collection, client),
+            "prodi": MongoProdiRepository(prodi_collection),
+            "blacklist": MongoBlacklistRepository(blacklist_collection),
+        }
+
+    raise ValueError(f"REPOSITORY_BACKEND tidak dikenal: {backend}")
+
+
+# === Dependency untuk FastAPI (bisa diganti lewat app.dependency_overrides) ===
+
+def get_user_repository():
+    return _repositories()["users"]
+
+
+def get_fakultas_repository():
+    return _repositories()["fakultas"]
+
+
+def get_prodi_repository():
+    return _repositories()["prodi"]
+
+
+def get_blacklist_repository():
+    return _repositories()["blacklist"]
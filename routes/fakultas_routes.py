@@ -1,16 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from models.fakultas_models import FakultasCreate, FakultasUpdate, FakultasOut
-from database import fakultas_collection
-from bson import ObjectId
+from repositories.base import FakultasRepository
+from repositories.providers import get_fakultas_repository
 from typing import List
 
 router = APIRouter(tags=["Fakultas"])
 
 # Create
 @router.post("/", response_model=FakultasOut)
-async def create_fakultas(data: FakultasCreate):
-    result = await fakultas_collection.insert_one(data.dict())
-    created_fakultas = await fakultas_collection.find_one({"_id": result.inserted_id})
+async def create_fakultas(
+    data: FakultasCreate,
+    fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)
+):
+    inserted_id = await fakultas_repo.insert(data.dict())
+    created_fakultas = await fakultas_repo.get(inserted_id)
     # Ubah _id (ObjectId) jadi string id untuk response model
     return FakultasOut(
         id=str(created_fakultas["_id"]),
@@ -19,10 +22,9 @@ async def create_fakultas(data: FakultasCreate):
 
 # Read All
 @router.get("/", response_model=List[FakultasOut])
-async def get_all_fakultas():
-    fakultas_cursor = fakultas_collection.find()
+async def get_all_fakultas(fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)):
     fakultas_list = []
-    async for fakultas in fakultas_cursor:
+    for fakultas in await fakultas_repo.list_all():
         fakultas["_id"] = str(fakultas["_id"])  # ✅ Konversi ObjectId ke string
         fakultas_list.append(FakultasOut(**fakultas))
     return fakultas_list
@@ -30,22 +32,26 @@ async def get_all_fakultas():
 
 # Read by ID
 @router.get("/{id}", response_model=FakultasOut)
-async def get_fakultas(id: str):
-    fakultas = await fakultas_collection.find_one({"_id": ObjectId(id)})
+async def get_fakultas(id: str, fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)):
+    fakultas = await fakultas_repo.get(id)
     if not fakultas:
         raise HTTPException(status_code=404, detail="Fakultas tidak ditemukan")
     return FakultasOut(id=str(fakultas["_id"]), nama=fakultas["nama"])
 
 # Update
 @router.put("/{id}", response_model=FakultasOut)
-async def update_fakultas(id: str, data: FakultasUpdate):
+async def update_fakultas(
+    id: str, data: FakultasUpdate,
+    fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)
+):
     update_data = {k: v for k, v in data.dict().items() if v is not None}
-    result = await fakultas_collection.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+    # Rename ikut dipropagasikan ke fakultas_nama di prodi
+    matched = await fakultas_repo.update(id, update_data)
     
-    if result.matched_count == 0:
+    if matched == 0:
         raise HTTPException(status_code=404, detail="Fakultas tidak ditemukan atau tidak ada perubahan")
 
-    fakultas = await fakultas_collection.find_one({"_id": ObjectId(id)})
+    fakultas = await fakultas_repo.get(id)
 
     return FakultasOut(
         id=str(fakultas["_id"]),
@@ -54,8 +60,8 @@ async def update_fakultas(id: str, data: FakultasUpdate):
 
 # Delete
 @router.delete("/{id}")
-async def delete_fakultas(id: str):
-    result = await fakultas_collection.delete_one({"_id": ObjectId(id)})
-    if result.deleted_count == 0:
+async def delete_fakultas(id: str, fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)):
+    deleted = await fakultas_repo.delete(id)
+    if deleted == 0:
         raise HTTPException(status_code=404, detail="Fakultas tidak ditemukan")
     return {"message": "Fakultas berhasil dihapus"}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Depends
+from auth.token import require_admin
+from utils.singleflight import singleflight
+from utils.audit import audit_bus
+from utils.compression import compressed_body_cache
+from utils.scheduler import scheduler
+from utils.loop_monitor import loop_monitor
+from utils.logging_config import logging_stats
+
+# Semua endpoint di router ini khusus admin
+router = APIRouter(tags=["Metrics"], dependencies=[Depends(require_admin)])
+
+# Nama metrics -> fungsi tanpa argumen yang mengembalikan dict statistik.
+# Fitur baru mendaftarkan statistiknya di sini.
+STATS_PROVIDERS = {
+    "singleflight": singleflight.stats,       # berapa query yang digabung
+    "audit": audit_bus.stats,
+    "compression": compressed_body_cache.stats,
+    "scheduler": scheduler.stats,
+    "loop": loop_monitor.stats,
+    "logging": logging_stats,
+}
+
+
+@router.get("/{name}")
+async def get_metrics(name: str):
+    provider = STATS_PROVIDERS.get(name)
+    if provider is None:
+        raise HTTPException(status_code=404, detail="Metrics tidak ditemukan")
+    return provider()
@@ -1,24 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from models.prodi_models import ProdiCreate, ProdiUpdate, ProdiOut
-from database import prodi_collection
+from repositories.base import FakultasRepository, ProdiRepository
+from repositories.providers import get_fakultas_repository, get_prodi_repository
 from bson import ObjectId
 
 router = APIRouter()
 
+async def get_fakultas_nama(fakultas_id: ObjectId, fakultas_repo: FakultasRepository):
+    # Validasi fakultas sekaligus ambil nama untuk snapshot di dokumen prodi
+    nama = await fakultas_repo.get_nama(fakultas_id)
+    if nama is None:
+        raise HTTPException(status_code=404, detail="Fakultas not found")
+    return nama
+
 @router.post("/prodi", response_model=ProdiOut, tags=["Prodi"])
-async def create_prodi(prodi: ProdiCreate):
+async def create_prodi(
+    prodi: ProdiCreate,
+    prodi_repo: ProdiRepository = Depends(get_prodi_repository),
+    fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)
+):
     prodi_dict = prodi.dict()
     prodi_dict["fakultas_id"] = ObjectId(prodi_dict["fakultas_id"])
-    result = await prodi_collection.insert_one(prodi_dict)
-    created = await prodi_collection.find_one({"_id": result.inserted_id})
+    prodi_dict["fakultas_nama"] = await get_fakultas_nama(prodi_dict["fakultas_id"], fakultas_repo)
+    inserted_id = await prodi_repo.insert(prodi_dict)
+    created = await prodi_repo.get(inserted_id)
     created["_id"] = str(created["_id"])
     created["fakultas_id"] = str(created["fakultas_id"])
     return ProdiOut(**created)
 
 @router.get("/prodi", response_model=list[ProdiOut], tags=["Prodi"])
-async def get_all_prodi():
+async def get_all_prodi(prodi_repo: ProdiRepository = Depends(get_prodi_repository)):
     prodi_list = []
-    async for doc in prodi_collection.find():
+    for doc in await prodi_repo.list_all():
         doc["_id"] = str(doc["_id"])
         doc["fakultas_id"] = str(doc.get("fakultas_id", ""))  # fallback kosong
         if "nama_prodi" not in doc:
@@ -27,10 +40,10 @@ async def get_all_prodi():
     return prodi_list
 
 @router.get("/prodi/{prodi_id}", response_model=ProdiOut, tags=["Prodi"])
-async def get_prodi(prodi_id: str):
+async def get_prodi(prodi_id: str, prodi_repo: ProdiRepository = Depends(get_prodi_repository)):
     if not ObjectId.is_valid(prodi_id):
         raise HTTPException(status_code=400, detail="Invalid prodi_id")
-    doc = await prodi_collection.find_one({"_id": ObjectId(prodi_id)})
+    doc = await prodi_repo.get(prodi_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Prodi not found")
     doc["_id"] = str(doc["_id"])
@@ -38,7 +51,11 @@ async def get_prodi(prodi_id: str):
     return ProdiOut(**doc)
 
 @router.put("/prodi/{prodi_id}", tags=["Prodi"])
-async def update_prodi(prodi_id: str, data: ProdiUpdate):
+async def update_prodi(
+    prodi_id: str, data: ProdiUpdate,
+    prodi_repo: ProdiRepository = Depends(get_prodi_repository),
+    fakultas_repo: FakultasRepository = Depends(get_fakultas_repository)
+):
     if not ObjectId.is_valid(prodi_id):
         raise HTTPException(status_code=400, detail="Invalid prodi_id")
     update_data = {k: v for k, v in data.dict().items() if v is not None}
@@ -46,16 +63,17 @@ async def update_prodi(prodi_id: str, data: ProdiUpdate):
         if not ObjectId.is_valid(update_data["fakultas_id"]):
             raise HTTPException(status_code=400, detail="Invalid fakultas_id")
         update_data["fakultas_id"] = ObjectId(update_data["fakultas_id"])
-    result = await prodi_collection.update_one({"_id": ObjectId(prodi_id)}, {"$set": update_data})
-    if result.modified_count == 0:
+        update_data["fakultas_nama"] = await get_fakultas_nama(update_data["fakultas_id"], fakultas_repo)
+    modified = await prodi_repo.update(prodi_id, update_data)
+    if modified == 0:
         raise HTTPException(status_code=404, detail="Prodi not found or no changes made")
     return {"message": "Prodi updated successfully"}
 
 @router.delete("/prodi/{prodi_id}", tags=["Prodi"])
-async def delete_prodi(prodi_id: str):
+async def delete_prodi(prodi_id: str, prodi_repo: ProdiRepository = Depends(get_prodi_repository)):
     if not ObjectId.is_valid(prodi_id):
         raise HTTPException(status_code=400, detail="Invalid prodi_id")
-    result = await prodi_collection.delete_one({"_id": ObjectId(prodi_id)})
-    if result.deleted_count == 0:
+    deleted = await prodi_repo.delete(prodi_id)
+    if deleted == 0:
         raise HTTPException(status_code=404, detail="Prodi not found")
     return {"message": "Prodi deleted successfully"}
@@ -1,4 +1,7 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Literal
+from datetime import datetime
 from bson import ObjectId
 from urllib.parse import quote
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
@@ -17,6 +20,10 @@ from models.user_models import (
 )
 
 from utils.email_utils import send_email, send_verification_email
+from utils.audit import audit_bus
+from utils.user_search import with_normalized_fields
+from repositories.base import UserRepository, BlacklistRepository
+from repositories.providers import get_user_repository, get_blacklist_repository
 
 from auth.token import (
     SECRET_KEY,
@@ -32,29 +39,17 @@ from auth.token import (
     verify_token,
     create_reset_password_token,
     verify_reset_password_token,
-    blacklist_collection,
     verify_token_from_string
 )
 
-from database import users_collection
-
 router = APIRouter()
 security = HTTPBasic()
-
-# == Utilities ==
-async def get_user_by_email(email: str):
-    return await users_collection.find_one({"email": email})
-
-async def get_user_by_id(user_id: str):
-    try:
-        return await users_collection.find_one({"_id": ObjectId(user_id)})
-    except:
-        return None
+logger = logging.getLogger(__name__)
 
 # == Routes ==
 @router.post("/register", response_model=UserOut)
-async def register(user: UserCreate):
-    existing = await get_user_by_email(user.email)
+async def register(user: UserCreate, users: UserRepository = Depends(get_user_repository)):
+    existing = await users.get_by_email(user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email sudah terdaftar.")
 
@@ -62,24 +57,27 @@ async def register(user: UserCreate):
     user_dict = user.dict()
     user_dict["password"] = hashed_password
     user_dict["is_verified"] = False
+    with_normalized_fields(user_dict)
 
-    result = await users_collection.insert_one(user_dict)
-    if not result.inserted_id:
+    inserted_id = await users.insert(user_dict)
+    if not inserted_id:
         raise HTTPException(status_code=500, detail="Gagal menyimpan user ke database.")
 
+    await audit_bus.emit("user.register", target=str(inserted_id), email=user.email)
+
     verification_token = create_email_verification_token(user.email)
     send_verification_email(user.email, verification_token)
 
     return UserOut(
         message="Registrasi berhasil",
-        id=str(result.inserted_id),
+        id=str(inserted_id),
         username=user.username,
         email=user.email,
         role=user.role
     )
 
 @router.get("/verify-email")
-async def verify_email(token: str):
+async def verify_email(token: str, users: UserRepository = Depends(get_user_repository)):
     payload = decode_token(token)
     email = payload.get("sub")
 
@@ -87,20 +85,22 @@ async def verify_email(token: str):
         raise HTTPException(status_code=400, detail="Token tidak mengandung email")
 
     # Update status is_verified jadi True
-    result = await users_collection.update_one({"email": email}, {"$set": {"is_verified": True}})
-    if result.modified_count == 0:
+    modified = await users.update_by_email(email, {"is_verified": True})
+    if modified == 0:
         raise HTTPException(status_code=404, detail="User tidak ditemukan atau sudah terverifikasi")
 
+    await audit_bus.emit("user.verify_email", email=email)
+
     return {"message": "Email berhasil diverifikasi"}
 
 @router.put("/users/change-email")
 async def change_email(
     payload: EmailChangeRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    users: UserRepository = Depends(get_user_repository)
 ):
-    print("DEBUG current_user:", current_user)
-
     user_id = current_user.get("user_id")   # fix di sini
+    logger.debug("change_email diminta", extra={"user_id": user_id})
     if not user_id:
         raise HTTPException(status_code=401, detail="User ID tidak ditemukan")
 
@@ -112,7 +112,7 @@ async def change_email(
     new_email = payload.new_email
 
     # cek apakah email baru sudah ada
-    existing_user = await users_collection.find_one({"email": new_email})
+    existing_user = await users.get_by_email(new_email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email sudah digunakan")
 
@@ -130,22 +130,19 @@ async def change_email(
     """
     send_email(new_email, "Verifikasi Email Baru Anda", email_body)
 
-    # update user
-    await users_collection.update_one(
-        {"_id": user_obj_id},
-        {
-            "$set": {
-                "is_verified": False,
-                "pending_email": new_email,
-                "email_verification_token": verification_token
-            }
-        }
-    )
+    # update user (status verifikasi sebelumnya tersimpan,
+    # dipulihkan oleh job maintenance kalau link tidak pernah diklik)
+    await users.request_email_change(user_obj_id, new_email, verification_token, datetime.utcnow())
+
+    await audit_bus.emit("user.change_email_requested", actor=user_id, target=user_id, new_email=new_email)
 
     return {"message": "Silakan cek email baru Anda untuk verifikasi"}
 
 @router.get("/users/verify-new-email")
-async def verify_new_email(token: str, request: Request):
+async def verify_new_email(
+    token: str, request: Request,
+    users: UserRepository = Depends(get_user_repository)
+):
     try:
         # ✅ Gunakan fungsi khusus ini
         payload = verify_token_from_string(token)
@@ -155,22 +152,29 @@ async def verify_new_email(token: str, request: Request):
 
         new_email = payload["sub"]
 
-        user = await users_collection.find_one({"email_verification_token": token})
+        user = await users.get_by_verification_token(token)
         if not user:
             raise HTTPException(status_code=404, detail="User tidak ditemukan atau token tidak valid")
 
-        await users_collection.update_one(
-            {"_id": user["_id"]},
-            {
-                "$set": {
-                    "email": new_email,
-                    "is_verified": True
-                },
-                "$unset": {
-                    "pending_email": "",
-                    "email_verification_token": ""
-                }
-            }
+        await users.update(
+            user["_id"],
+            with_normalized_fields({
+                "email": new_email,
+                "is_verified": True
+            }),
+            unset=[
+                "pending_email",
+                "email_verification_token",
+                "email_change_requested_at",
+                "pending_email_prev_verified"
+            ]
+        )
+
+        await audit_bus.emit(
+            "user.change_email_verified",
+            target=str(user["_id"]),
+            old_email=user.get("email"),
+            new_email=new_email
         )
 
         return {"message": "Email berhasil diverifikasi"}
@@ -179,13 +183,11 @@ async def verify_new_email(token: str, request: Request):
         raise HTTPException(status_code=400, detail="Token tidak valid atau sudah kedaluwarsa")
 
 @router.post("/login")
-async def login(credentials: HTTPBasicCredentials = Depends(security)):
-    user = await users_collection.find_one({
-        "$or": [
-            {"email": credentials.username},
-            {"username": credentials.username}
-        ]
-    })
+async def login(
+    credentials: HTTPBasicCredentials = Depends(security),
+    users: UserRepository = Depends(get_user_repository)
+):
+    user = await users.get_by_login(credentials.username)
 
     if not user or not verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Login gagal")
@@ -206,8 +208,11 @@ async def login(credentials: HTTPBasicCredentials = Depends(security)):
     }
 
 @router.post("/request-password-reset")
-async def request_password_reset(data: PasswordResetRequest):
-    user = await users_collection.find_one({"email": data.email})
+async def request_password_reset(
+    data: PasswordResetRequest,
+    users: UserRepository = Depends(get_user_repository)
+):
+    user = await users.get_by_email(data.email)
     if not user:
         raise HTTPException(status_code=404, detail="Email tidak ditemukan.")
 
@@ -233,18 +238,20 @@ async def request_password_reset(data: PasswordResetRequest):
     return {"message": "Link reset password telah dikirim ke email Anda."}
 
 @router.post("/reset-password")
-async def reset_password(data: PasswordResetConfirm):
+async def reset_password(
+    data: PasswordResetConfirm,
+    users: UserRepository = Depends(get_user_repository)
+):
     email = verify_reset_password_token(data.token)
     hashed_pw = hash_password(data.new_password)
 
-    result = await users_collection.update_one(
-        {"email": email},
-        {"$set": {"password": hashed_pw}}
-    )
+    modified = await users.update_by_email(email, {"password": hashed_pw})
 
-    if result.modified_count == 0:
+    if modified == 0:
         raise HTTPException(status_code=400, detail="Gagal mengganti password.")
 
+    await audit_bus.emit("user.reset_password", email=email)
+
     return {"message": "Password berhasil diperbarui. Silakan login kembali."}
 
 @router.get("/me")
@@ -262,21 +269,36 @@ async def get_users(
     username: str = Query(None),
     email: str = Query(None),
     role: str = Query(None),
-    current_user: dict = Depends(get_verified_user)
+    username_prefix: str = Query(None, description="Awalan username, case-insensitive"),
+    email_prefix: str = Query(None, description="Awalan email, case-insensitive"),
+    q: str = Query(None, description="Pencarian bebas pada username dan email"),
+    sort_by: Literal["username", "email", "created"] = Query(None),
+    sort_order: Literal["asc", "desc"] = Query("asc"),
+    current_user: dict = Depends(get_verified_user),
+    users_repo: UserRepository = Depends(get_user_repository)
 ):
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Hanya admin yang boleh mengakses ini.")
 
-    query = {}
-    if username: query["username"] = username
-    if email: query["email"] = email
-    if role: query["role"] = role
-
-    total = await users_collection.count_documents(query)
+    try:
+        total, found = await users_repo.search(
+            username=username,
+            email=email,
+            role=role,
+            username_prefix=username_prefix,
+            email_prefix=email_prefix,
+            q=q,
+            sort_by=sort_by,
+            sort_order=1 if sort_order == "asc" else -1,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        # Kombinasi filter/sort yang tidak punya index
+        raise HTTPException(status_code=400, detail=str(e))
 
     users = []
-    cursor = users_collection.find(query).skip(skip).limit(limit)
-    async for user in cursor:
+    for user in found:
         users.append({
             "id": str(user["_id"]),
             "username": user["username"],
@@ -295,16 +317,18 @@ async def get_users(
 @router.patch("/users/{user_id}", response_model=UserOut)
 async def update_user(
     user_id: str, update_data: UserUpdate,
-    current_user: dict = Depends(get_verified_user)
+    current_user: dict = Depends(get_verified_user),
+    users: UserRepository = Depends(get_user_repository)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Hanya admin yang dapat mengupdate user lain")
 
-    user = await get_user_by_id(user_id)
+    user = await users.get_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User tidak ditemukan")
 
     update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+    with_normalized_fields(update_dict)
 
     if "password" in update_dict:
         update_dict["password"] = hash_password(update_dict["password"])
@@ -316,12 +340,18 @@ async def update_user(
     ):
         raise HTTPException(status_code=403, detail="Admin tidak dapat mengubah role dirinya sendiri")
 
-    await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": update_dict}
+    await users.update(user_id, update_dict)
+
+    await audit_bus.emit(
+        "user.admin_update",
+        actor=current_user["user_id"],
+        target=user_id,
+        fields=sorted(update_dict),
+        old_role=user.get("role"),
+        new_role=update_dict.get("role", user.get("role"))
     )
 
-    updated_user = await get_user_by_id(user_id)
+    updated_user = await users.get_by_id(user_id)
 
     return UserOut(
         id=str(updated_user["_id"]),
@@ -334,7 +364,8 @@ async def update_user(
 @router.patch("/update-user/{user_id}")
 async def update_self(
     user_id: str, data: UserSelfUpdate,
-    current_user: dict = Depends(get_verified_user)
+    current_user: dict = Depends(get_verified_user),
+    users: UserRepository = Depends(get_user_repository)
 ):
     if current_user["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Kamu hanya dapat mengubah data dirimu sendiri.")
@@ -346,23 +377,24 @@ async def update_self(
 
     if not update_data:
         raise HTTPException(status_code=400, detail="Tidak ada data yang diupdate.")
+    with_normalized_fields(update_data)
 
-    result = await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": update_data}
-    )
+    _, modified = await users.update(user_id, update_data)
 
-    if result.modified_count == 0:
+    if modified == 0:
         return {"message": "Tidak ada perubahan data."}
 
+    await audit_bus.emit("user.self_update", actor=user_id, target=user_id, fields=sorted(update_data))
+
     return {"message": "Data user berhasil diupdate."}
 
 @router.put("/change-password", tags=["Users"])
 async def change_password(
     password_data: ChangePasswordRequest,
-    current_user: dict = Depends(get_verified_user)
+    current_user: dict = Depends(get_verified_user),
+    users: UserRepository = Depends(get_user_repository)
 ):
-    user = await users_collection.find_one({"_id": ObjectId(current_user["user_id"])})
+    user = await users.get_by_id(current_user["user_id"])
 
     if not user:
         raise HTTPException(status_code=404, detail="User tidak ditemukan")
@@ -371,29 +403,37 @@ async def change_password(
         raise HTTPException(status_code=400, detail="Password lama salah")
 
     new_hashed = hash_password(password_data.new_password)
-    await users_collection.update_one(
-        {"_id": ObjectId(current_user["user_id"])},
-        {"$set": {"password": new_hashed}}
-    )
+    await users.update(current_user["user_id"], {"password": new_hashed})
+
+    await audit_bus.emit("user.change_password", actor=current_user["user_id"], target=current_user["user_id"])
 
     return {"message": "Password berhasil diubah"}
 
 @router.delete("/users/{user_id}")
-async def delete_user(user_id: str, current_user: dict = Depends(get_verified_user)):
-    user = await get_user_by_id(user_id)
+async def delete_user(
+    user_id: str,
+    current_user: dict = Depends(get_verified_user),
+    users: UserRepository = Depends(get_user_repository)
+):
+    user = await users.get_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User tidak ditemukan")
 
-    await users_collection.delete_one({"_id": ObjectId(user_id)})
+    await users.delete(user_id)
+    await audit_bus.emit("user.delete", actor=current_user["user_id"], target=user_id, email=user.get("email"))
     return {"message": "User berhasil dihapus", "id": user_id}
 
 @router.post("/logout")
-async def logout(request: Request, token: dict = Depends(verify_token)):
+async def logout(
+    request: Request,
+    token: dict = Depends(verify_token),
+    blacklist: BlacklistRepository = Depends(get_blacklist_repository)
+):
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         raise HTTPException(status_code=401, detail="Authorization header tidak ditemukan")
 
     token_str = auth_header.replace("Bearer ", "")
-    await blacklist_collection.insert_one({"token": token_str})
+    await blacklist.add(token_str)
 
     return {"message": "Logout berhasil. Token telah di-blacklist"}
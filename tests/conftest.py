@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+# Harus di-set sebelum main/auth di-import: konfigurasi dibaca saat import
+os.environ.setdefault("REPOSITORY_BACKEND", "memory")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import main
+from auth.token import create_access_token
+from repositories.memory import (
+    MemoryBlacklistRepository,
+    MemoryFakultasRepository,
+    MemoryProdiRepository,
+    MemoryUserRepository,
+)
+from repositories.providers import (
+    get_blacklist_repository,
+    get_fakultas_repository,
+    get_prodi_repository,
+    get_user_repository,
+)
+from routes import user_routes
+
+
+@pytest.fixture
+def repositories():
+    # Repository baru per test, dipasang lewat dependency_overrides
+    prodi = MemoryProdiRepository()
+    repos = {
+        "users": MemoryUserRepository(),
+        "fakultas": MemoryFakultasRepository(prodi),
+        "prodi": prodi,
+        "blacklist": MemoryBlacklistRepository(),
+    }
+    overrides = {
+        get_user_repository: lambda: repos["users"],
+        get_fakultas_repository: lambda: repos["fakultas"],
+        get_prodi_repository: lambda: repos["prodi"],
+        get_blacklist_repository: lambda: repos["blacklist"],
+    }
+    main.app.dependency_overrides.update(overrides)
+    yield repos
+    for dependency in overrides:
+        main.app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    # Tidak ada SMTP di test; catat email yang akan dikirim
+    sent = []
+    monkeypatch.setattr(user_routes, "send_verification_email", lambda email, token: sent.append((email, token)))
+    monkeypatch.setattr(user_routes, "send_email", lambda *args, **kwargs: sent.append((args, kwargs)))
+    return sent
+
+
+@pytest.fixture
+def client(repositories, sent_emails):
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_header():
+    def make(role: str = "user", is_verified: bool = True, **claims) -> dict:
+        token = create_access_token({"user_id": "0" * 24, "role": role, "is_verified": is_verified, **claims})
+        return {"Authorization": f"Bearer {token}"}
+    return make
@@ -0,0 +1,122 @@
+import asyncio
+
+from utils.audit import AuditBus
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_many(self, docs, ordered=False):
+        self.batches.append([doc["event"] for doc in docs])
+
+
+def make_bus(policy, collection=None, max_buffer=2):
+    # batch_size > max_buffer dan interval panjang: flusher tidak jalan sendiri selama test
+    return AuditBus(
+        collection or FakeCollection(),
+        batch_size=100,
+        flush_interval=60,
+        max_buffer=max_buffer,
+        policy=policy,
+        block_timeout=0.05,
+    )
+
+
+def buffered(bus):
+    return [doc["event"] for doc in bus._buffer]
+
+
+def test_emit_is_noop_until_started():
+    bus = make_bus("drop_oldest")
+
+    async def run():
+        for i in range(5):
+            await bus.emit(f"e{i}")
+
+    asyncio.run(run())
+    assert buffered(bus) == []
+    assert bus.stats()["skipped"] == 5
+    assert bus.stats()["dropped"] == 0
+
+
+def test_drop_newest_keeps_buffered_events():
+    bus = make_bus("drop_newest")
+
+    async def run():
+        await bus.start()
+        for i in range(4):
+            await bus.emit(f"e{i}")
+        result = buffered(bus)
+        await bus.stop()
+        return result
+
+    assert asyncio.run(run()) == ["e0", "e1"]
+    assert bus.dropped == 2
+
+
+def test_drop_oldest_keeps_latest_events():
+    bus = make_bus("drop_oldest")
+
+    async def run():
+        await bus.start()
+        for i in range(4):
+            await bus.emit(f"e{i}")
+        result = buffered(bus)
+        await bus.stop()
+        return result
+
+    assert asyncio.run(run()) == ["e2", "e3"]
+    assert bus.dropped == 2
+
+
+def test_block_waits_for_flush_then_enqueues():
+    collection = FakeCollection()
+    bus = make_bus("block", collection)
+
+    async def run():
+        await bus.start()
+        await bus.emit("e0")
+        await bus.emit("e1")
+        # Flush membebaskan ruang saat emit ketiga sedang menunggu
+        emit = asyncio.ensure_future(bus.emit("e2"))
+        await asyncio.sleep(0)
+        await bus.flush()
+        await emit
+        result = buffered(bus)
+        await bus.stop()
+        return result
+
+    assert asyncio.run(run()) == ["e2"]
+    assert bus.dropped == 0
+    assert collection.batches == [["e0", "e1"], ["e2"]]
+
+
+def test_block_drops_after_timeout():
+    bus = make_bus("block")
+
+    async def run():
+        await bus.start()
+        for i in range(3):
+            await bus.emit(f"e{i}")
+        result = buffered(bus)
+        await bus.stop()
+        return result
+
+    assert asyncio.run(run()) == ["e0", "e1"]
+    assert bus.dropped == 1
+
+
+def test_stop_flushes_remaining_events():
+    collection = FakeCollection()
+    bus = make_bus("drop_oldest", collection, max_buffer=10)
+
+    async def run():
+        await bus.start()
+        await bus.emit("a")
+        await bus.emit("b")
+        await bus.stop()
+
+    asyncio.run(run())
+    assert collection.batches == [["a", "b"]]
+    assert bus.written == 2
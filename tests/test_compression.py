@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from utils import compression
+from utils.compression import CompressedBodyCache, CompressionMiddleware, negotiate_encoding
+
+AVAILABLE = ("br", "zstd", "gzip")
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),                       # seri: urutan preferensi server
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0", None),
+    ("br;q=0, *", "zstd"),                    # q eksplisit mengalahkan wildcard
+    ("identity", None),
+    ("identity, gzip;q=0.1", "gzip"),
+    ("GZIP;q=abc", None),                     # q tidak valid dianggap 0
+])
+def test_negotiate_encoding(accept, expected):
+    assert negotiate_encoding(accept, AVAILABLE) == expected
+
+
+def make_app(body: bytes, content_type: bytes = b"application/json"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def get(middleware, path="/users/users", accept="gzip"):
+    async def run():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept})
+    return asyncio.run(run())
+
+
+def test_small_body_is_not_compressed():
+    middleware = CompressionMiddleware(make_app(b"{}" * 10), minimum_size=1024, cache=CompressedBodyCache())
+    response = get(middleware)
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_non_compressible_type_is_skipped():
+    middleware = CompressionMiddleware(make_app(b"\x89PNG" * 1000, b"image/png"), minimum_size=16, cache=CompressedBodyCache())
+    response = get(middleware)
+    assert "content-encoding" not in response.headers
+    assert response.content == b"\x89PNG" * 1000
+
+
+def test_large_body_is_compressed_off_the_event_loop(monkeypatch):
+    offloaded = []
+
+    async def fake_threadpool(fn, *args):
+        offloaded.append(len(args[0]))
+        return fn(*args)
+
+    monkeypatch.setattr(compression, "run_in_threadpool", fake_threadpool)
+    body = b'{"x": 1}' * 20_000
+    middleware = CompressionMiddleware(
+        make_app(body), minimum_size=16, threadpool_min_size=64 * 1024, cache=CompressedBodyCache()
+    )
+    response = get(middleware)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == body           # httpx sudah men-decode gzip
+    assert offloaded == [len(body)]
+
+    offloaded.clear()
+    small = CompressionMiddleware(make_app(body[:2048]), minimum_size=16, threadpool_min_size=64 * 1024)
+    assert get(small).headers["content-encoding"] == "gzip"
+    assert offloaded == []
+
+
+def test_cached_paths_compress_once():
+    cache = CompressedBodyCache()
+    body = b'{"nama": "Teknik"}' * 200
+    middleware = CompressionMiddleware(make_app(body), minimum_size=16, cache_paths=("/fakultas",), cache=cache)
+    for _ in range(3):
+        response = get(middleware, path="/fakultas/")
+        assert response.content == body
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_compressed_length_header_matches_body():
+    body = b'{"x": 1}' * 500
+    middleware = CompressionMiddleware(make_app(body), minimum_size=16, cache=CompressedBodyCache())
+
+    async def run():
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/x", "headers": [(b"accept-encoding", b"gzip")]}
+        await middleware(scope, receive, send)
+        return messages
+
+    start, body_message = asyncio.run(run())
+    headers = dict(start["headers"])
+    assert int(headers[b"content-length"]) == len(body_message["body"])
+    assert gzip.decompress(body_message["body"]) == body
@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from repositories.mongo import MongoFakultasRepository
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    async def update_one(self, filter, update, session=None):
+        self.calls.append(("update_one", session))
+        return SimpleNamespace(matched_count=1)
+
+    async def update_many(self, filter, update, session=None):
+        self.calls.append(("update_many", update, session))
+        return SimpleNamespace(modified_count=1)
+
+    async def delete_one(self, filter, session=None):
+        self.calls.append(("delete_one", session))
+        return SimpleNamespace(deleted_count=1)
+
+
+class FakeSession:
+    def __init__(self, fail_first=0, error=None):
+        self.fail_first = fail_first
+        self.error = error
+        self.attempts = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        if self.error is not None:
+            raise self.error
+        # Seperti driver: callback diulang selama error-nya transient
+        while True:
+            self.attempts += 1
+            result = await callback(self)
+            if self.attempts > self.fail_first:
+                return result
+
+
+class FakeClient:
+    def __init__(self, session):
+        self.session = session
+
+    async def start_session(self):
+        return self.session
+
+
+def make_repo(session):
+    return MongoFakultasRepository(FakeCollection("fakultas"), FakeCollection("prodi"), FakeClient(session))
+
+
+def test_rename_runs_in_with_transaction():
+    session = FakeSession(fail_first=1)
+    repo = make_repo(session)
+    assert asyncio.run(repo.update(str(ObjectId()), {"nama": "Teknik"})) == 1
+    assert session.attempts == 2
+    assert all(call[-1] is session for call in repo.prodi_collection.calls)
+
+
+def test_standalone_server_falls_back_without_session():
+    session = FakeSession(error=OperationFailure("no replica set", code=20))
+    repo = make_repo(session)
+    assert asyncio.run(repo.update(str(ObjectId()), {"nama": "Teknik"})) == 1
+    assert repo.transactions_supported is False
+    assert repo.prodi_collection.calls[0][-1] is None
+
+
+def test_delete_unsets_snapshot_on_orphaned_prodi():
+    session = FakeSession()
+    repo = make_repo(session)
+    assert asyncio.run(repo.delete(str(ObjectId()))) == 1
+    (_, update, used_session), = repo.prodi_collection.calls
+    assert update == {"$unset": {"fakultas_nama": ""}}
+    assert used_session is session
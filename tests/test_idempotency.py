@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import httpx
+from pymongo.errors import DuplicateKeyError
+
+from utils.idempotency import IdempotencyMiddleware
+
+PATH = "/orders"
+
+
+class FakeCollection:
+    """Pengganti koleksi ``idempotency_keys`` (Motor) yang disimpan di dict."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+
+    def _match(self, filter):
+        doc = self.docs.get(filter["_id"])
+        if doc is None:
+            return None
+        for field, cond in filter.items():
+            if isinstance(cond, dict):
+                if not (field in doc and doc[field] < cond["$lt"]):
+                    return None
+            elif doc.get(field) != cond:
+                return None
+        return doc
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def update_one(self, filter, update):
+        doc = self._match(filter)
+        if doc is not None:
+            self._apply(doc, update)
+
+    async def find_one_and_update(self, filter, update):
+        doc = self._match(filter)
+        if doc is None:
+            return None
+        before = dict(doc)
+        self._apply(doc, update)
+        return before
+
+    async def delete_one(self, filter):
+        if self._match(filter) is not None:
+            del self.docs[filter["_id"]]
+
+    async def find_one(self, filter):
+        doc = self._match(filter)
+        return dict(doc) if doc else None
+
+
+class CountingApp:
+    """App ASGI yang mencatat berapa kali request benar-benar dijalankan."""
+
+    def __init__(self, status=201, delay=0.05):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        body = json.dumps({"call": self.calls, "echo": message["body"].decode()}).encode()
+        await send({"type": "http.response.start", "status": self.status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def post(middleware, body, key="key-1"):
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(PATH, content=body, headers={"Idempotency-Key": key})
+
+
+def stored_key(key="key-1"):
+    # _id dokumen sama dengan yang diturunkan middleware (tanpa header Authorization)
+    return hashlib.sha256(b"\0".join([PATH.encode(), b"", key.encode()])).hexdigest()
+
+
+def make_middleware(app, collection=None):
+    return IdempotencyMiddleware(app, paths=(PATH,), collection=collection or FakeCollection())
+
+
+def test_retry_is_replayed():
+    app = CountingApp()
+    middleware = make_middleware(app)
+
+    async def run():
+        first = await post(middleware, b'{"a":1}')
+        second = await post(middleware, b'{"a":1}')
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert app.calls == 1
+    assert first.status_code == second.status_code == 201
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+def test_same_key_different_body_is_rejected():
+    app = CountingApp()
+    middleware = make_middleware(app)
+
+    async def run():
+        await post(middleware, b'{"a":1}')
+        return await post(middleware, b'{"a":2}')
+
+    response = asyncio.run(run())
+    assert response.status_code == 422
+    assert app.calls == 1
+
+
+def test_concurrent_duplicates_execute_once():
+    app = CountingApp()
+    middleware = make_middleware(app)
+
+    async def run():
+        return await asyncio.gather(*(post(middleware, b'{"a":1}') for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert app.calls == 1
+    assert {r.content for r in responses} == {responses[0].content}
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 4
+
+
+def test_concurrent_duplicates_across_workers_execute_once():
+    # Dua instance middleware (dua worker) berbagi koleksi yang sama
+    app = CountingApp()
+    collection = FakeCollection()
+    workers = [make_middleware(app, collection), make_middleware(app, collection)]
+
+    async def run():
+        return await asyncio.gather(*(post(worker, b'{"a":1}') for worker in workers))
+
+    first, second = asyncio.run(run())
+    assert app.calls == 1
+    assert first.content == second.content
+
+
+def test_stale_pending_lease_is_taken_over():
+    # Worker sebelumnya mati di tengah request: klaim pending-nya tertinggal
+    app = CountingApp(delay=0)
+    collection = FakeCollection()
+    collection.docs[stored_key()] = {
+        "_id": stored_key(),
+        "fingerprint": "lama",
+        "state": "pending",
+        "owner": "worker-mati",
+        "locked_until": datetime.utcnow() - timedelta(seconds=1),
+        "created_at": datetime.utcnow() - timedelta(minutes=1),
+    }
+    middleware = make_middleware(app, collection)
+
+    async def run():
+        first = await post(middleware, b'{"a":1}')
+        second = await post(make_middleware(app, collection), b'{"a":1}')
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert app.calls == 1
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+    assert collection.docs[stored_key()]["state"] == "done"
+    assert collection.docs[stored_key()]["owner"] != "worker-mati"
+
+
+def test_live_pending_lease_is_not_taken_over(monkeypatch):
+    monkeypatch.setattr("utils.idempotency.IDEMPOTENCY_WAIT_TIMEOUT", 0.1)
+    app = CountingApp(delay=0)
+    collection = FakeCollection()
+    collection.docs[stored_key()] = {
+        "_id": stored_key(),
+        "fingerprint": "lama",
+        "state": "pending",
+        "owner": "worker-lain",
+        "locked_until": datetime.utcnow() + timedelta(minutes=1),
+        "created_at": datetime.utcnow(),
+    }
+
+    response = asyncio.run(post(make_middleware(app, collection), b'{"a":1}'))
+    assert response.status_code == 409
+    assert app.calls == 0
+    assert collection.docs[stored_key()]["owner"] == "worker-lain"
+
+
+def test_server_error_is_not_stored():
+    app = CountingApp(status=500, delay=0)
+    collection = FakeCollection()
+    middleware = make_middleware(app, collection)
+
+    async def run():
+        await post(middleware, b'{"a":1}')
+        return await post(middleware, b'{"a":1}')
+
+    response = asyncio.run(run())
+    assert response.status_code == 500
+    assert app.calls == 2
+    assert collection.docs == {}
+
+
+def test_requests_without_key_pass_through():
+    app = CountingApp(delay=0)
+    middleware = make_middleware(app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+            await client.post(PATH, content=b"{}")
+            await client.post(PATH, content=b"{}")
+
+    asyncio.run(run())
+    assert app.calls == 2
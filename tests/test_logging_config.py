@@ -0,0 +1,38 @@
+import io
+import json
+import logging
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from utils import logging_config
+from utils.logging_config import logging_stats, setup_logging, shutdown_logging
+
+
+def test_setup_after_shutdown_logs_again():
+    shutdown_logging()
+    try:
+        for cycle in range(2):
+            stream = io.StringIO()
+            setup_logging("INFO", stream=stream)
+            logging.getLogger("test").info("siklus %s", cycle)
+            shutdown_logging()
+            assert [json.loads(line)["msg"] for line in stream.getvalue().splitlines()] == [f"siklus {cycle}"]
+            assert logging_config.queue_handler not in logging.getLogger().handlers
+    finally:
+        setup_logging()
+
+
+def test_second_lifespan_drains_log_queue():
+    # Dua siklus lifespan dalam satu proses (mis. dua TestClient berurutan)
+    for _ in range(2):
+        with TestClient(main.app):
+            logging.getLogger("test").warning("di dalam lifespan")
+            # Listener di thread terpisah; beri waktu untuk menguras queue
+            deadline = time.monotonic() + 2
+            while logging_stats()["queue_depth"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert logging_stats()["queue_depth"] == 0
+        assert logging_stats() == {"enabled": False}
+    setup_logging()
@@ -0,0 +1,94 @@
+def register(client, username, email, password="rahasia123", role=None):
+    return client.post("/users/register", json={
+        "username": username, "email": email, "password": password, "role": role
+    })
+
+
+def test_register_verify_login_me(client, repositories, sent_emails):
+    response = register(client, "John Doe", "john@example.com")
+    assert response.status_code == 200
+    stored = repositories["users"].table.find_one("email", "john@example.com")
+    assert stored["username_lower"] == "john doe"
+    assert stored["is_verified"] is False
+
+    email, token = sent_emails[-1]
+    assert email == "john@example.com"
+    assert client.get("/users/verify-email", params={"token": token}).status_code == 200
+
+    login = client.post("/users/login", auth=("john@example.com", "rahasia123"))
+    assert login.status_code == 200
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    me = client.get("/users/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["email"] == "john@example.com"
+
+
+def test_register_duplicate_email(client):
+    assert register(client, "a", "dup@example.com").status_code == 200
+    assert register(client, "b", "dup@example.com").status_code == 400
+
+
+def test_logout_blacklists_token(client, repositories, auth_header):
+    headers = auth_header()
+    assert client.post("/users/logout", headers=headers).status_code == 200
+    token = headers["Authorization"].split()[1]
+    assert repositories["blacklist"].table.lookup("token", token)
+    assert client.post("/users/logout", headers=headers).status_code == 401
+
+
+def test_admin_search_uses_repository(client, auth_header):
+    for name in ["Alice", "alfred", "Bob"]:
+        register(client, name, f"{name.lower()}@example.com")
+    admin = auth_header("admin")
+
+    response = client.get("/users/users", params={"username_prefix": "AL"}, headers=admin)
+    assert response.status_code == 200
+    assert [u["username"] for u in response.json()["data"]] == ["alfred", "Alice"]
+    assert response.json()["total_users"] == 2
+
+    response = client.get("/users/users", params={"sort_by": "username", "sort_order": "desc"}, headers=admin)
+    assert [u["username"] for u in response.json()["data"]] == ["Bob", "Alice", "alfred"]
+
+    assert client.get("/users/users", headers=auth_header()).status_code == 403
+
+
+def test_admin_search_rejects_unindexed_shapes(client, auth_header):
+    admin = auth_header("admin")
+    for params in [
+        {"role": "admin", "q": "john"},
+        {"username_prefix": "jo", "sort_by": "created"},
+        {"email_prefix": "jo", "sort_by": "username"},
+    ]:
+        assert client.get("/users/users", params=params, headers=admin).status_code == 400
+
+
+def test_fakultas_rename_propagates_to_prodi(client):
+    fakultas = client.post("/fakultas/", json={"nama": "Teknik"}).json()
+    prodi = client.post("/prodi/prodi", json={"nama_prodi": "Informatika", "fakultas_id": fakultas["_id"]})
+    assert prodi.status_code == 200
+    assert prodi.json()["fakultas_nama"] == "Teknik"
+
+    response = client.put(f"/fakultas/{fakultas['_id']}", json={"nama": "Teknik Elektro"})
+    assert response.status_code == 200
+    prodi = client.get(f"/prodi/prodi/{prodi.json()['_id']}").json()
+    assert prodi["fakultas_nama"] == "Teknik Elektro"
+
+
+def test_fakultas_delete_clears_snapshot_on_orphaned_prodi(client):
+    fakultas = client.post("/fakultas/", json={"nama": "Teknik"}).json()
+    prodi = client.post("/prodi/prodi", json={"nama_prodi": "Informatika", "fakultas_id": fakultas["_id"]}).json()
+
+    assert client.delete(f"/fakultas/{fakultas['_id']}").status_code == 200
+    assert client.get(f"/prodi/prodi/{prodi['_id']}").json()["fakultas_nama"] is None
+
+
+def test_prodi_requires_existing_fakultas(client):
+    response = client.post("/prodi/prodi", json={"nama_prodi": "X", "fakultas_id": "0" * 24})
+    assert response.status_code == 404
+
+
+def test_metrics_admin_only(client, auth_header):
+    assert client.get("/metrics/singleflight", headers=auth_header("admin")).status_code == 200
+    assert client.get("/metrics/singleflight", headers=auth_header()).status_code == 403
+    assert client.get("/metrics/singleflight", headers=auth_header("admin", is_verified=False)).status_code == 403
+    assert client.get("/metrics/nope", headers=auth_header("admin")).status_code == 404
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.scheduler import Scheduler
+
+
+class FakeLockCollection:
+    """Pengganti ``scheduler_locks`` untuk filter yang dipakai Scheduler."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _matches(self, doc, filter):
+        for key, value in filter.items():
+            if key == "$or":
+                if not any(self._matches(doc, option) for option in value):
+                    return False
+            elif isinstance(value, dict) and "$lt" in value:
+                if not doc.get(key) < value["$lt"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    async def find_one_and_update(self, filter, update, upsert=False, return_document=None):
+        doc = self.docs.get(filter["_id"])
+        if doc is None:
+            doc = self.docs[filter["_id"]] = {"_id": filter["_id"]}
+        elif not self._matches(doc, filter):
+            raise DuplicateKeyError("lock dipegang worker lain")
+        doc.update(update["$set"])
+        return dict(doc)
+
+    async def update_one(self, filter, update):
+        doc = self.docs.get(filter["_id"])
+        if doc is None or not self._matches(doc, filter):
+            return SimpleNamespace(matched_count=0)
+        doc.update(update["$set"])
+        return SimpleNamespace(matched_count=1)
+
+
+def make_scheduler(collection, duration):
+    scheduler = Scheduler(collection)
+
+    @scheduler.job("purge", interval=0.06)
+    async def purge():
+        await asyncio.sleep(duration)
+        return "done"
+
+    return scheduler
+
+
+def test_lease_is_renewed_while_job_runs():
+    collection = FakeLockCollection()
+    first = make_scheduler(collection, duration=0.3)
+    second = make_scheduler(collection, duration=0)
+
+    async def run():
+        running = asyncio.ensure_future(first.run_once(first.jobs["purge"]))
+        # Jauh melewati interval (0.06 s): tanpa perpanjangan lock sudah kedaluwarsa
+        await asyncio.sleep(0.2)
+        await second.run_once(second.jobs["purge"])
+        await running
+
+    asyncio.run(run())
+    assert first.jobs["purge"].runs == 1
+    assert second.jobs["purge"].runs == 0
+    assert second.jobs["purge"].skipped == 1
+
+
+def test_job_stops_when_lease_is_taken_over():
+    collection = FakeLockCollection()
+    scheduler = make_scheduler(collection, duration=1)
+
+    async def run():
+        running = asyncio.ensure_future(scheduler.run_once(scheduler.jobs["purge"]))
+        await asyncio.sleep(0.01)
+        # Mis. worker ini sempat hang dan lock-nya diambil worker lain
+        collection.docs["purge"]["owner"] = "other-worker"
+        await asyncio.wait_for(running, 0.5)
+
+    asyncio.run(run())
+    job = scheduler.jobs["purge"]
+    assert job.runs == 0
+    assert job.failures == 1
+    assert job.last_error == "lock diambil worker lain"
+
+
+def test_lock_held_after_success_and_released_on_failure():
+    collection = FakeLockCollection()
+    scheduler = Scheduler(collection)
+
+    @scheduler.job("ok", interval=60)
+    async def ok():
+        return 1
+
+    @scheduler.job("boom", interval=60)
+    async def boom():
+        raise RuntimeError("boom")
+
+    async def run():
+        await scheduler.run_once(scheduler.jobs["ok"])
+        await scheduler.run_once(scheduler.jobs["boom"])
+
+    asyncio.run(run())
+    now = datetime.utcnow()
+    assert collection.docs["ok"]["expires_at"] > now
+    assert collection.docs["boom"]["expires_at"] <= now
+    assert scheduler.jobs["boom"].last_error == "RuntimeError('boom')"
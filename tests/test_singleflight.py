@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+from repositories.mongo import MongoProdiRepository
+from utils.singleflight import coalesced_find, coalesced_find_one, singleflight
+
+
+class _Cursor:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def to_list(self, length=None):
+        self.collection.queries += 1
+        await asyncio.sleep(self.collection.delay)
+        return [dict(doc) for doc in self.collection.docs]
+
+
+class FakeCollection:
+    """Koleksi Motor tiruan yang lambat, untuk melihat query yang digabung."""
+
+    def __init__(self, name="prodi", delay=0.05):
+        self.name = name
+        self.delay = delay
+        self.docs = []
+        self.queries = 0
+
+    async def find_one(self, filter, projection=None):
+        self.queries += 1
+        await asyncio.sleep(self.delay)
+        return next((dict(doc) for doc in self.docs if doc.items() >= filter.items()), None)
+
+    def find(self, filter=None, projection=None):
+        return _Cursor(self)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+
+def test_concurrent_identical_queries_collapse():
+    collection = FakeCollection()
+    collection.docs.append({"_id": 1, "nama_prodi": "Informatika"})
+
+    async def run():
+        return await asyncio.gather(*(coalesced_find_one(collection, {"_id": 1}) for _ in range(10)))
+
+    collapsed_before = singleflight.collapsed
+    results = asyncio.run(run())
+    assert collection.queries == 1
+    assert singleflight.collapsed - collapsed_before == 9
+    assert all(result == {"_id": 1, "nama_prodi": "Informatika"} for result in results)
+    # Setiap pemanggil dapat salinan sendiri
+    results[0]["nama_prodi"] = "diubah"
+    assert results[1]["nama_prodi"] == "Informatika"
+
+
+def test_different_filters_do_not_collapse():
+    collection = FakeCollection()
+
+    async def run():
+        await asyncio.gather(coalesced_find_one(collection, {"_id": 1}), coalesced_find_one(collection, {"_id": 2}))
+
+    asyncio.run(run())
+    assert collection.queries == 2
+
+
+def test_collection_outside_scope_is_not_coalesced():
+    collection = FakeCollection(name="users")
+
+    async def run():
+        await asyncio.gather(*(coalesced_find_one(collection, {"_id": 1}) for _ in range(3)))
+
+    asyncio.run(run())
+    assert collection.queries == 3
+
+
+def test_write_invalidates_inflight_query():
+    collection = FakeCollection()
+    repo = MongoProdiRepository(collection)
+
+    async def run():
+        # Query pertama dimulai sebelum insert; yang sesudah insert tidak boleh menumpang
+        before = asyncio.ensure_future(repo.list_all())
+        await asyncio.sleep(0)
+        await repo.insert({"_id": 1, "nama_prodi": "Informatika"})
+        after = await repo.list_all()
+        return await before, after
+
+    before, after = asyncio.run(run())
+    assert collection.queries == 2
+    assert after == [{"_id": 1, "nama_prodi": "Informatika"}]
+
+
+def test_completed_query_is_not_reused():
+    collection = FakeCollection(delay=0)
+
+    async def run():
+        await coalesced_find(collection)
+        await coalesced_find(collection)
+
+    asyncio.run(run())
+    assert collection.queries == 2
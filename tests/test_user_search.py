@@ -0,0 +1,67 @@
+import sys
+
+import pytest
+
+from utils import user_search
+from utils.user_search import SUPPORTED_SHAPES, build_user_search, prefix_range, resolve_user_search
+
+
+def test_prefix_range_is_tight():
+    assert prefix_range("Jo") == {"$gte": "jo", "$lt": "jp"}
+
+
+def test_prefix_range_carries_past_max_code_point():
+    top = chr(sys.maxunicode)
+    assert prefix_range("a" + top) == {"$gte": "a" + top, "$lt": "b"}
+    assert prefix_range(top * 2) == {"$gte": top * 2}
+
+
+def test_prefix_range_skips_surrogates():
+    assert prefix_range("a\ud7ff") == {"$gte": "a\ud7ff", "$lt": "a\ue000"}
+
+
+@pytest.mark.parametrize("params, sort_by", [
+    ({}, "created"),
+    ({"role": "admin", "sort_by": "email"}, "email"),
+    ({"username_prefix": "jo"}, "username"),
+    ({"username": "John", "sort_by": "created"}, "created"),
+    ({"username": "John", "username_prefix": "x"}, "username"),
+    ({"email": "j@x.io", "username_prefix": "jo"}, "email"),
+    ({"q": "john"}, None),
+])
+def test_resolve_accepts_indexed_shapes(params, sort_by):
+    assert resolve_user_search(**params)["sort_by"] == sort_by
+
+
+@pytest.mark.parametrize("params", [
+    {"q": "john", "role": "admin"},
+    {"q": "john", "sort_by": "username"},
+    {"username_prefix": "jo", "email_prefix": "jo"},
+    {"username_prefix": "jo", "sort_by": "created"},
+    {"email_prefix": "jo", "sort_by": "username"},
+    {"username": "John", "sort_by": "email"},
+])
+def test_resolve_rejects_unindexed_shapes(params):
+    with pytest.raises(ValueError):
+        resolve_user_search(**params)
+
+
+def test_supported_shapes_are_all_accepted():
+    for params in SUPPORTED_SHAPES.values():
+        build_user_search(**params)
+
+
+def test_text_search_has_stable_tie_breaker(monkeypatch):
+    monkeypatch.setattr(user_search, "USER_TEXT_INDEX", True)
+    query, projection, sort = build_user_search(q="john", skip=10)
+    assert "$text" in query
+    assert sort == [("score", {"$meta": "textScore"}), ("_id", 1)]
+
+
+def test_fallback_search_only_serves_first_page(monkeypatch):
+    monkeypatch.setattr(user_search, "USER_TEXT_INDEX", False)
+    query, projection, sort = build_user_search(q="john")
+    assert sort is None
+    assert "$or" in query
+    with pytest.raises(ValueError):
+        build_user_search(q="john", skip=10)
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from database import audit_collection
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 100))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 2.0))       # detik
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", 10_000))              # batas memori
+# drop_newest | drop_oldest | block
+AUDIT_OVERFLOW_POLICY = os.getenv("AUDIT_OVERFLOW_POLICY", "drop_oldest").lower()
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", 0.05))        # detik, untuk policy "block"
+# capped | timeseries
+AUDIT_COLLECTION_MODE = os.getenv("AUDIT_COLLECTION_MODE", "capped").lower()
+AUDIT_CAPPED_SIZE_BYTES = int(os.getenv("AUDIT_CAPPED_SIZE_BYTES", 256 * 1024 * 1024))
+AUDIT_TTL_SECONDS = int(os.getenv("AUDIT_TTL_SECONDS", 90 * 24 * 3600))   # untuk mode timeseries
+
+
+class AuditBus:
+    """Event bus in-process untuk audit log.
+
+    Event ditampung di buffer berukuran tetap dan ditulis ke MongoDB secara
+    batch (``insert_many``) saat buffer mencapai ``batch_size`` atau setiap
+    ``flush_interval`` detik, sehingga request tidak menunggu round trip audit.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        max_buffer: int = AUDIT_MAX_BUFFER,
+        policy: str = AUDIT_OVERFLOW_POLICY,
+        block_timeout: float = AUDIT_BLOCK_TIMEOUT,
+    ):
+        if policy not in ("drop_newest", "drop_oldest", "block"):
+            raise ValueError(f"Policy audit tidak dikenal: {policy}")
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._buffer = deque()
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task = None
+        self._closing = False
+        self._flush_lock = asyncio.Lock()
+
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.skipped = 0
+
+    # === Produksi event ===
+
+    async def emit(self, event: str, actor: str = None, target: str = None, **data):
+        if self._task is None:
+            # Flusher belum/tidak jalan (mis. REPOSITORY_BACKEND=memory): tanpa ini
+            # buffer penuh lalu setiap emit kena policy overflow.
+            self.skipped += 1
+            return
+        doc = {
+            "ts": datetime.utcnow(),
+            "event": event,
+            "meta": {"actor": actor, "target": target},
+            "data": data,
+        }
+
+        if len(self._buffer) >= self.max_buffer:
+            if self.policy == "block":
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), self.block_timeout)
+                except asyncio.TimeoutError:
+                    pass
+            if len(self._buffer) >= self.max_buffer:
+                if self.policy == "drop_oldest":
+                    self._buffer.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return
+
+        self._buffer.append(doc)
+        self.emitted += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    # === Flush ke MongoDB ===
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._space.set()
+                try:
+                    await self.collection.insert_many(batch, ordered=False)
+                    self.written += len(batch)
+                except BulkWriteError as e:
+                    inserted = e.details.get("nInserted", 0)
+                    self.written += inserted
+                    self.failed += len(batch) - inserted
+                    logger.warning("Audit insert_many sebagian gagal: %s", e.details.get("writeErrors"))
+                except Exception:
+                    # PyMongoError, tapi juga mis. bson.errors.InvalidDocument dari data
+                    # event yang tidak bisa di-encode. Tidak di-requeue supaya memori
+                    # tetap terbatas saat MongoDB bermasalah.
+                    self.failed += len(batch)
+                    logger.exception("Gagal menulis %d audit event", len(batch))
+                    return
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Flusher harus tetap hidup; event berikutnya dicoba di putaran selanjutnya
+                logger.exception("Flush audit gagal")
+
+    # === Lifecycle ===
+
+    async def ensure_collection(self, mode: str = AUDIT_COLLECTION_MODE):
+        db = self.collection.database
+        options = {}
+        if mode == "capped":
+            options = {"capped": True, "size": AUDIT_CAPPED_SIZE_BYTES}
+        elif mode == "timeseries":
+            options = {
+                "timeseries": {"timeField": "ts", "metaField": "meta", "granularity": "seconds"},
+                "expireAfterSeconds": AUDIT_TTL_SECONDS,
+            }
+        try:
+            await db.create_collection(self.collection.name, **options)
+        except CollectionInvalid:
+            pass  # sudah ada
+        if mode != "timeseries":
+            await self.collection.create_index([("meta.target", 1), ("ts", -1)])
+
+    async def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Tidak di-cancel supaya batch yang sedang ditulis tidak hilang
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        # Pastikan tidak ada event yang hilang saat shutdown
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "policy": self.policy,
+        }
+
+
+audit_bus = AuditBus(audit_collection)
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+# Brotli dan zstd opsional: kalau paketnya tidak terpasang, encoding itu tidak ditawarkan
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# === Konfigurasi ===
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))      # byte
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))     # 1-9
+COMPRESSION_BROTLI_LEVEL = int(os.getenv("COMPRESSION_BROTLI_LEVEL", 5)) # 0-11
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))     # 1-22
+# Response di bawah prefix ini (data referensi) disimpan varian terkompresinya
+COMPRESSION_CACHE_PATHS = tuple(
+    p.strip() for p in os.getenv("COMPRESSION_CACHE_PATHS", "/fakultas,/prodi").split(",") if p.strip()
+)
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+# Body sebesar ini atau lebih dikompres di threadpool supaya tidak memblokir event loop
+COMPRESSION_THREADPOOL_MIN_SIZE = int(os.getenv("COMPRESSION_THREADPOOL_MIN_SIZE", 64 * 1024))   # byte
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+def _compressors():
+    available = {}
+    if brotli is not None:
+        available["br"] = lambda body: brotli.compress(body, quality=COMPRESSION_BROTLI_LEVEL)
+    if zstandard is not None:
+        available["zstd"] = lambda body: zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(body)
+    available["gzip"] = lambda body: gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+    return available
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    # Pilih encoding dengan q tertinggi; kalau seri, ikuti urutan preferensi server
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedBodyCache:
+    """LRU varian terkompresi, di-key dengan hash isi body.
+
+    Karena key-nya isi body, cache tidak pernah menyajikan data basi: begitu
+    datanya berubah, hash berubah dan varian baru dikompres sekali.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_compress(self, body: bytes, encoding: str, compress) -> bytes:
+        # ``compress`` adalah coroutine function: kompresi bisa jalan di threadpool
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        compressed = await compress(body)
+        if len(compressed) <= self.max_bytes:
+            self._entries[key] = compressed
+            self._size += len(compressed)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return compressed
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        cache_paths: tuple = COMPRESSION_CACHE_PATHS,
+        cache: CompressedBodyCache = None,
+        threadpool_min_size: int = COMPRESSION_THREADPOOL_MIN_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_min_size = threadpool_min_size
+        self.cache_paths = cache_paths
+        self.cache = cache if cache is not None else compressed_body_cache
+        self.compressors = _compressors()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"), self.compressors)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        use_cache = scope["method"] == "GET" and scope["path"].startswith(self.cache_paths)
+        start_message = None
+        body_parts = []
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                await send(message)
+                return
+
+            if message.get("more_body", False) and not body_parts:
+                # Response streaming diteruskan apa adanya
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            await self._send_response(start_message, body, encoding, use_cache, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _compress(self, body: bytes, encoding: str) -> bytes:
+        compress = self.compressors[encoding]
+        if len(body) >= self.threadpool_min_size:
+            # Puluhan ms untuk body MB-an; gzip/brotli/zstd melepas GIL saat kompres
+            return await run_in_threadpool(compress, body)
+        return compress(body)
+
+    async def _send_response(self, start_message, body, encoding, use_cache, send):
+        headers = [(k, v) for k, v in start_message.get("headers", [])]
+        header_names = {k.lower() for k, _ in headers}
+        content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"").decode("latin-1")
+
+        should_compress = (
+            len(body) >= self.minimum_size
+            and b"content-encoding" not in header_names
+            and start_message["status"] not in (204, 304)
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+        if should_compress:
+            if use_cache:
+                body = await self.cache.get_or_compress(body, encoding, lambda b: self._compress(b, encoding))
+            else:
+                body = await self._compress(body, encoding)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+        if b"vary" not in header_names:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        await send({**start_message, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+compressed_body_cache = CompressedBodyCache()
@@ -1,26 +1,22 @@
 import os
+import logging
 import smtplib
 from email.message import EmailMessage
 from dotenv import load_dotenv
-import traceback
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SMTP_SERVER = os.getenv("SMTP_SERVER")           # smtp.ethereal.email
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))     # 587
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")                  # dari Ethereal
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")         # email ethereal
 
 def send_email(to_email: str, subject: str, body: str):
-    # DEBUG: Tampilkan isi email ke terminal
-    print("\n📧 Simulated Email")
-    print(f"To: {to_email}")
-    print(f"Subject: {subject}")
-    print("Body:")
-    print(body)
-    print("=============================\n")
-
-    # Tetap kirim email seperti biasa
+    # Isi email tidak di-log: berisi link dengan token verifikasi/reset
+    logger.debug("Mengirim email", extra={"to": to_email, "subject": subject, "body_length": len(body)})
+
     message = EmailMessage()
     message["From"] = SENDER_EMAIL
     message["To"] = to_email
@@ -32,9 +28,9 @@ def send_email(to_email: str, subject: str, body: str):
             server.starttls()
             server.login(SENDER_EMAIL, SENDER_PASSWORD)
             server.send_message(message)
-        print(f"✅ Email sent successfully to {to_email}")
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+        logger.info("Email terkirim", extra={"to": to_email, "subject": subject})
+    except Exception:
+        logger.exception("Gagal mengirim email", extra={"to": to_email, "subject": subject})
 
 def send_verification_email(receiver_email: str, token: str):
     subject = "Verifikasi Email Akun Anda"
@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+from database import idempotency_collection
+
+# === Konfigurasi ===
+IDEMPOTENCY_PATHS = tuple(
+    p.strip()
+    for p in os.getenv(
+        "IDEMPOTENCY_PATHS",
+        "/users/register,/users/request-password-reset,/fakultas/,/prodi/prodi",
+    ).split(",")
+    if p.strip()
+)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 10.0))   # detik, tunggu worker lain
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", 0.05))
+# Masa berlaku klaim "pending"; diperpanjang selama request berjalan. Kalau worker
+# mati di tengah request, retry mengambil alih setelah lease habis (bukan TTL 24 jam).
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", 30.0))
+IDEMPOTENCY_LOCAL_MAX = int(os.getenv("IDEMPOTENCY_LOCAL_MAX", 10_000))
+
+# Header response yang ikut disimpan dan diputar ulang
+STORED_HEADERS = (b"content-type", b"location")
+
+# Hasil _wait_for_stored: request ini yang sekarang memegang key
+_ACQUIRED = object()
+
+
+async def ensure_idempotency_indexes(collection=idempotency_collection):
+    # TTL index: MongoDB menghapus key yang sudah kedaluwarsa sendiri
+    await collection.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+
+
+def _json_error(status: int, detail: str):
+    body = ('{"detail":"%s"}' % detail).encode()
+    return status, [(b"content-type", b"application/json")], body
+
+
+class IdempotencyMiddleware:
+    """Menyimpan dan memutar ulang response POST berdasarkan header ``Idempotency-Key``.
+
+    Lapisan pertama adalah cache in-process (termasuk request identik yang
+    sedang berjalan di worker yang sama); lapisan kedua adalah koleksi
+    ``idempotency_keys`` dengan TTL index, yang dibagi antar worker.
+    """
+
+    def __init__(self, app, paths: tuple = IDEMPOTENCY_PATHS, collection=idempotency_collection):
+        self.app = app
+        self.paths = set(paths)
+        self.collection = collection
+        self._inflight = {}
+        self._completed = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        idem_key = headers.get(b"idempotency-key")
+        if not idem_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        # Key dipisah per path dan per pemilik token supaya client lain tidak bisa memutar ulang
+        key = hashlib.sha256(
+            b"\0".join([scope["path"].encode(), headers.get(b"authorization", b""), idem_key])
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        response = self._local_lookup(key)
+        if response is None and key in self._inflight:
+            response = await asyncio.shield(self._inflight[key])
+        if response is not None:
+            await self._replay(response, fingerprint, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._execute(scope, body, key, fingerprint)
+            future.set_result(response)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()   # hindari warning "exception was never retrieved"
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if response.get("replayed"):
+            await self._replay(response, fingerprint, send)
+        else:
+            await self._send(response, send)
+
+    # === Eksekusi & penyimpanan ===
+
+    async def _execute(self, scope, body, key, fingerprint):
+        owner = uuid.uuid4().hex
+        if not await self._claim(key, fingerprint, owner):
+            # Worker lain sudah/sedang memproses key ini
+            stored = await self._wait_for_stored(key, fingerprint, owner)
+            if stored is None:
+                status, headers, body = _json_error(409, "Request dengan Idempotency-Key ini masih diproses")
+                return {"status": status, "headers": headers, "body": body, "fingerprint": fingerprint}
+            if stored is not _ACQUIRED:
+                stored["replayed"] = True
+                self._remember(key, stored)
+                return stored
+
+        keeper = asyncio.create_task(self._keep_lease(key, owner))
+        try:
+            status, headers, response_body = await self._run_app(scope, body)
+        except BaseException:
+            await self.collection.delete_one({"_id": key, "owner": owner})
+            raise
+        finally:
+            keeper.cancel()
+        response = {
+            "status": status,
+            "headers": [(k, v) for k, v in headers if k.lower() in STORED_HEADERS],
+            "body": response_body,
+            "fingerprint": fingerprint,
+        }
+
+        if status >= 500:
+            # Error server tidak disimpan supaya retry benar-benar dijalankan ulang
+            await self.collection.delete_one({"_id": key, "owner": owner})
+            return {**response, "headers": headers}
+
+        await self.collection.update_one(
+            {"_id": key, "owner": owner},
+            {"$set": {
+                "state": "done",
+                "status": status,
+                "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in response["headers"]],
+                "body": Binary(response_body),
+            }, "$unset": {"locked_until": ""}},
+        )
+        self._remember(key, response)
+        # Request asli tetap menerima semua header, bukan hanya yang disimpan
+        return {**response, "headers": headers}
+
+    # === Klaim & lease ===
+
+    async def _claim(self, key, fingerprint, owner) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({
+                "_id": key,
+                "fingerprint": fingerprint,
+                "state": "pending",
+                "owner": owner,
+                "locked_until": now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS),
+                "created_at": now,
+            })
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _take_over(self, key, fingerprint, owner) -> bool:
+        # Klaim pending yang lease-nya habis (pemiliknya mati di tengah request)
+        now = datetime.utcnow()
+        doc = await self.collection.find_one_and_update(
+            {"_id": key, "state": "pending", "locked_until": {"$lt": now}},
+            {"$set": {
+                "fingerprint": fingerprint,
+                "owner": owner,
+                "locked_until": now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS),
+            }},
+        )
+        return doc is not None
+
+    async def _keep_lease(self, key, owner):
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_LEASE_SECONDS / 3)
+            await self.collection.update_one(
+                {"_id": key, "owner": owner, "state": "pending"},
+                {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)}},
+            )
+
+    async def _wait_for_stored(self, key, fingerprint, owner):
+        # Kembalikan response tersimpan, _ACQUIRED kalau key diambil alih
+        # request ini, atau None kalau masih diproses saat batas waktu habis.
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            doc = await self.collection.find_one({"_id": key})
+            if doc is None:
+                # Pemilik sebelumnya gagal (5xx/exception) dan melepas key
+                if await self._claim(key, fingerprint, owner):
+                    return _ACQUIRED
+                continue
+            if doc.get("state") == "done":
+                return {
+                    "status": doc["status"],
+                    "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in doc["headers"]],
+                    "body": bytes(doc["body"]),
+                    "fingerprint": doc["fingerprint"],
+                }
+            # Dokumen lama tanpa locked_until hanya bisa kedaluwarsa lewat TTL
+            locked_until = doc.get("locked_until")
+            if locked_until is not None and locked_until < datetime.utcnow():
+                if await self._take_over(key, fingerprint, owner):
+                    return _ACQUIRED
+                continue
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    async def _run_app(self, scope, body):
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Tunggu selamanya seperti server ASGI saat client belum disconnect
+            await asyncio.Event().wait()
+
+        start = {}
+        chunks = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return start["status"], list(start.get("headers", [])), b"".join(chunks)
+
+    # === Cache in-process ===
+
+    def _local_lookup(self, key):
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._completed[key]
+            return None
+        self._completed.move_to_end(key)
+        return response
+
+    def _remember(self, key, response):
+        self._completed[key] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, response)
+        self._completed.move_to_end(key)
+        while len(self._completed) > IDEMPOTENCY_LOCAL_MAX:
+            self._completed.popitem(last=False)
+
+    # === Kirim response ===
+
+    async def _replay(self, response, fingerprint, send):
+        if response["fingerprint"] != fingerprint:
+            status, headers, body = _json_error(422, "Idempotency-Key sudah dipakai untuk request yang berbeda")
+            await self._send({"status": status, "headers": headers, "body": body}, send)
+            return
+        await self._send(response, send, replayed=True)
+
+    async def _send(self, response, send, replayed: bool = False):
+        headers = [(k, v) for k, v in response["headers"] if k.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(response["body"])).encode("latin-1")))
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": response["body"]})
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
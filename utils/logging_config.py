@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# === Konfigurasi ===
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))   # 0..1, hanya untuk DEBUG
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+
+request_id_var = ContextVar("request_id", default=None)
+
+SENSITIVE_KEYS = re.compile(r"pass(word)?|token|secret|authorization|api_key", re.IGNORECASE)
+SENSITIVE_VALUES = [
+    re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+"),          # JWT
+    re.compile(r"\$2[aby]\$\d{2}\$[./\w]{53}"),         # hash bcrypt
+    re.compile(r"(?i)(bearer\s+)[\w.-]+"),
+]
+REDACTED = "[REDACTED]"
+
+# Atribut standar LogRecord; sisanya dianggap field `extra`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if SENSITIVE_KEYS.search(str(k)) else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    if isinstance(value, str):
+        for pattern in SENSITIVE_VALUES:
+            value = pattern.sub(lambda m: (m.group(1) if m.groups() else "") + REDACTED, value)
+        return value
+    return value
+
+
+class RedactFilter(logging.Filter):
+    # Dijalankan sebelum record masuk queue, jadi data sensitif tidak pernah meninggalkan proses
+    def filter(self, record):
+        record.msg = redact(record.msg)
+        if record.args:
+            record.args = redact(record.args)
+        for key in set(vars(record)) - _RESERVED:
+            value = getattr(record, key)
+            setattr(record, key, REDACTED if SENSITIVE_KEYS.search(key) else redact(value))
+        return True
+
+
+class DebugSampleFilter(logging.Filter):
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key in set(vars(record)) - _RESERVED - {"request_id"}:
+            data[key] = getattr(record, key)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler dengan queue terbatas; saat penuh record dibuang, bukan menunggu."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Format pesan (merge args) di sini, tapi serialisasi JSON dan I/O
+        # dikerjakan thread listener.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        # Pesan exception/traceback bisa memuat token atau hash (mis. JWTError)
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+queue_handler = None
+listener = None
+
+
+def setup_logging(level: str = LOG_LEVEL, stream=None):
+    global queue_handler, listener
+    if listener is not None:
+        return
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampleFilter())
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(RedactFilter())
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+
+def shutdown_logging():
+    global queue_handler, listener
+    if listener is not None:
+        listener.stop()   # flush sisa record di queue
+        listener = None
+    # Lepas handler dari root supaya record berikutnya tidak masuk queue yang
+    # tidak lagi dikuras, dan setup_logging() bisa dipanggil lagi
+    if queue_handler is not None:
+        logging.getLogger().removeHandler(queue_handler)
+        queue_handler = None
+
+
+def logging_stats() -> dict:
+    if queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "enqueued": queue_handler.enqueued,
+        "dropped": queue_handler.dropped,
+        "queue_depth": queue_handler.queue.qsize(),
+    }
+
+
+class RequestIdMiddleware:
+    """Memberi setiap request ID (dari header ``X-Request-ID`` atau baru) untuk log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+if __name__ == "__main__":
+    # Ukur overhead logging di jalur request: waktu yang dihabiskan thread
+    # pemanggil per record (I/O sendiri berjalan di thread listener).
+    import io
+    import time
+
+    setup_logging("DEBUG", stream=io.StringIO())
+    logger = logging.getLogger("bench")
+    n = 50_000
+    for label, emit in [
+        ("info", lambda i: logger.info("login user_id=%s", i)),
+        ("info+extra", lambda i: logger.info("login", extra={"user_id": i, "token": "secret"})),
+        ("debug (sampled)", lambda i: logger.debug("detail %s", i)),
+        ("disabled level", lambda i: logging.getLogger("bench.off").log(5, "noop %s", i)),
+    ]:
+        started = time.perf_counter()
+        for i in range(n):
+            emit(i)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<16} {elapsed / n * 1e6:8.2f} us/call")
+    stats = logging_stats()
+    shutdown_logging()
+    print(stats)
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from fastapi import HTTPException
+
+from auth.token import decode_token
+from repositories.providers import get_blacklist_repository
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi (opt-in, untuk staging / diagnosa) ===
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "0") == "1"
+LOOP_MONITOR_THRESHOLD = float(os.getenv("LOOP_MONITOR_THRESHOLD", 0.1))   # detik
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.02))    # detik
+LOOP_MONITOR_MAX_REPORTS = int(os.getenv("LOOP_MONITOR_MAX_REPORTS", 100))
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+
+# Frame dari file di luar proyek (stdlib, site-packages) tidak dilaporkan sebagai pelaku
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+
+
+class LoopMonitor:
+    """Mendeteksi callback yang memblokir event loop.
+
+    Event loop menulis heartbeat secara berkala; thread monitor memeriksa
+    umur heartbeat. Kalau melewati ``threshold``, stack thread event loop
+    diambil lewat ``sys._current_frames()`` saat callback masih berjalan,
+    lalu dipetakan ke route dan fungsi proyek yang sedang dieksekusi.
+    """
+
+    def __init__(self, threshold: float = LOOP_MONITOR_THRESHOLD, interval: float = LOOP_MONITOR_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.reports = deque(maxlen=LOOP_MONITOR_MAX_REPORTS)
+        self.blocked_count = 0
+        self.max_lag = 0.0
+        self._routes = {}
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._heartbeat_task = None
+
+    def register_routes(self, app):
+        # code object endpoint -> path route, untuk memetakan stack ke route
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is not None:
+                methods = ",".join(sorted(getattr(route, "methods", None) or []))
+                self._routes[code] = f"{methods} {route.path}".strip()
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            lag = time.monotonic() - beat
+            if lag < self.threshold or beat == reported_beat:
+                continue
+            # satu laporan per kejadian blocking
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._report(frame, lag)
+
+    def _report(self, frame, lag: float):
+        stack = traceback.extract_stack(frame)
+        route = None
+        function = None
+        current = frame
+        while current is not None:
+            if route is None and current.f_code in self._routes:
+                route = self._routes[current.f_code]
+            current = current.f_back
+        for entry in reversed(stack):
+            if _is_project_frame(entry.filename) and not entry.filename.endswith("loop_monitor.py"):
+                function = f"{os.path.relpath(entry.filename, PROJECT_ROOT)}:{entry.lineno} {entry.name}"
+                break
+
+        self.blocked_count += 1
+        self.max_lag = max(self.max_lag, lag)
+        report = {
+            "lag_ms": round(lag * 1000, 1),
+            "route": route,
+            "function": function,
+            "stack": traceback.format_list(stack[-15:]),
+        }
+        self.reports.append(report)
+        logger.warning(
+            "Event loop terblokir >= %.0f ms di route=%s fungsi=%s",
+            report["lag_ms"], route, function
+        )
+
+    async def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._thread is not None,
+            "threshold_ms": self.threshold * 1000,
+            "blocked_count": self.blocked_count,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent": list(self.reports),
+        }
+
+
+loop_monitor = LoopMonitor()
+
+
+# === Sampling profiler (pyinstrument) ===
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover
+    Profiler = None
+
+
+async def _is_admin_request(scope, headers: dict) -> bool:
+    # Pemeriksaan yang sama dengan dependency require_admin: token valid,
+    # belum di-blacklist (logout), email terverifikasi, dan role admin.
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.startswith("Bearer "):
+        return False
+    token = auth[len("Bearer "):]
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        return False
+    if payload.get("role") != "admin" or not payload.get("is_verified", False):
+        return False
+    app = scope.get("app")
+    overrides = getattr(app, "dependency_overrides", {})
+    blacklist = overrides.get(get_blacklist_repository, get_blacklist_repository)()
+    return not await blacklist.contains(token)
+
+
+class ProfilerMiddleware:
+    """Profil satu request dengan pyinstrument kalau admin meminta.
+
+    Dipicu oleh header ``X-Profile: 1`` atau query ``?profile=1``; response
+    asli diganti laporan HTML pyinstrument.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if Profiler is None:
+            logger.warning("PROFILER_ENABLED=1 tetapi pyinstrument tidak terpasang; profiler dinonaktifkan")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or Profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        query = scope.get("query_string", b"").decode("latin-1")
+        requested = headers.get(b"x-profile") == b"1" or "profile=1" in query.split("&")
+        if not requested or not await _is_admin_request(scope, headers):
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message):
+            pass
+
+        profiler = Profiler(interval=0.001, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
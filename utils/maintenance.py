@@ -0,0 +1,151 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from database import users_collection, fakultas_collection, prodi_collection
+from utils.audit import audit_bus
+from utils.scheduler import (
+    SCHEDULER_BATCH_PAUSE,
+    SCHEDULER_BATCH_SIZE,
+    batched_delete_many,
+    batched_update_many,
+    scheduler,
+)
+from utils.singleflight import singleflight
+
+# === Konfigurasi ===
+# Sama dengan masa berlaku token verifikasi email baru di change_email (24 jam)
+PENDING_EMAIL_TTL_HOURS = int(os.getenv("PENDING_EMAIL_TTL_HOURS", 24))
+UNVERIFIED_USER_TTL_DAYS = int(os.getenv("UNVERIFIED_USER_TTL_DAYS", 7))
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", 15 * 60))   # detik
+CONSISTENCY_CHECK_INTERVAL = float(os.getenv("CONSISTENCY_CHECK_INTERVAL", 5 * 60))   # detik
+
+# Partial index: hanya dokumen yang relevan untuk job yang masuk index,
+# jadi ukurannya kecil dan tidak membebani write user biasa.
+MAINTENANCE_INDEXES = [
+    IndexModel(
+        [("email_change_requested_at", ASCENDING)],
+        name="pending_email_requested_at",
+        partialFilterExpression={"pending_email": {"$exists": True}},
+    ),
+    IndexModel(
+        [("is_verified", ASCENDING), ("_id", ASCENDING)],
+        name="unverified_is_verified_1__id_1",
+        partialFilterExpression={"is_verified": False},
+    ),
+]
+
+
+async def ensure_maintenance_indexes():
+    await users_collection.create_indexes(MAINTENANCE_INDEXES)
+    # dipakai propagasi nama fakultas dan consistency checker
+    await prodi_collection.create_index(
+        [("fakultas_id", ASCENDING), ("fakultas_nama", ASCENDING)],
+        name="fakultas_id_1_fakultas_nama_1"
+    )
+
+
+@scheduler.job("expire_pending_email_changes", interval=MAINTENANCE_INTERVAL)
+async def expire_pending_email_changes():
+    now = datetime.utcnow()
+
+    # Dokumen lama belum punya timestamp; mulai hitung TTL dari sekarang
+    stamped = await batched_update_many(
+        users_collection,
+        {"pending_email": {"$exists": True}, "email_change_requested_at": {"$exists": False}},
+        {"$set": {"email_change_requested_at": now}},
+    )
+
+    # Kembalikan status verifikasi sebelum permintaan ganti email. Dokumen lama
+    # (sebelum pending_email_prev_verified ada) tidak bisa dibedakan dari
+    # registrasi yang belum pernah verifikasi, jadi tetap tidak terverifikasi;
+    # tanpa itu job ini memverifikasi akun yang emailnya tidak pernah dikonfirmasi.
+    expired = await batched_update_many(
+        users_collection,
+        {
+            "pending_email": {"$exists": True},
+            "email_change_requested_at": {"$lt": now - timedelta(hours=PENDING_EMAIL_TTL_HOURS)},
+        },
+        [
+            {"$set": {"is_verified": {"$ifNull": ["$pending_email_prev_verified", False]}}},
+            {"$unset": [
+                "pending_email",
+                "email_verification_token",
+                "email_change_requested_at",
+                "pending_email_prev_verified",
+            ]},
+        ],
+    )
+
+    if expired:
+        await audit_bus.emit("maintenance.expire_pending_email", count=expired)
+    return {"stamped": stamped, "expired": expired}
+
+
+@scheduler.job("purge_unverified_registrations", interval=MAINTENANCE_INTERVAL)
+async def purge_unverified_registrations():
+    # Umur akun dibaca dari ObjectId, jadi tidak butuh field created_at
+    cutoff = ObjectId.from_datetime(datetime.utcnow() - timedelta(days=UNVERIFIED_USER_TTL_DAYS))
+    deleted = await batched_delete_many(
+        users_collection,
+        {
+            "_id": {"$lt": cutoff},
+            "is_verified": False,
+            # user yang sedang ganti email juga is_verified=False; itu urusan job di atas
+            "pending_email": {"$exists": False},
+        },
+    )
+
+    if deleted:
+        await audit_bus.emit("maintenance.purge_unverified", count=deleted)
+    return {"deleted": deleted}
+
+
+def _repair_prodi(prodi) -> UpdateOne:
+    # fakultas_id ikut di filter: prodi yang baru dipindah fakultas tidak ditimpa nama lama
+    target = {"_id": prodi["_id"], "fakultas_id": prodi.get("fakultas_id")}
+    if "nama" not in prodi:
+        # fakultas sudah dihapus
+        return UpdateOne(target, {"$unset": {"fakultas_nama": ""}})
+    return UpdateOne(target, {"$set": {"fakultas_nama": prodi["nama"]}})
+
+
+@scheduler.job("check_prodi_fakultas_nama", interval=CONSISTENCY_CHECK_INTERVAL)
+async def check_prodi_fakultas_nama():
+    # Samakan snapshot fakultas_nama di prodi dengan nama fakultas terkini.
+    # Menangkap prodi lama (belum punya snapshot), rename yang tidak dijalankan
+    # dalam transaksi, dan prodi yang fakultasnya sudah dihapus. Semua selisih
+    # dicari dalam satu pass $lookup, lalu diperbaiki per batch.
+    pipeline = [
+        {"$lookup": {
+            "from": fakultas_collection.name,
+            "localField": "fakultas_id",
+            "foreignField": "_id",
+            "as": "fakultas",
+        }},
+        {"$project": {
+            "fakultas_id": 1,
+            "fakultas_nama": 1,
+            "nama": {"$arrayElemAt": ["$fakultas.nama", 0]},
+        }},
+        # missing vs missing dianggap sama: prodi yatim tanpa snapshot tidak disentuh
+        {"$match": {"$expr": {"$ne": ["$fakultas_nama", "$nama"]}}},
+    ]
+
+    repaired = 0
+    batch = []
+    async for prodi in prodi_collection.aggregate(pipeline):
+        batch.append(_repair_prodi(prodi))
+        if len(batch) >= SCHEDULER_BATCH_SIZE:
+            repaired += (await prodi_collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+            await asyncio.sleep(SCHEDULER_BATCH_PAUSE)
+    if batch:
+        repaired += (await prodi_collection.bulk_write(batch, ordered=False)).modified_count
+
+    if repaired:
+        singleflight.invalidate(prodi_collection.name)
+    return {"repaired": repaired}
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", 500))
+SCHEDULER_BATCH_PAUSE = float(os.getenv("SCHEDULER_BATCH_PAUSE", 0.2))   # detik jeda antar batch
+SCHEDULER_LEASE_RENEW_INTERVAL = float(os.getenv("SCHEDULER_LEASE_RENEW_INTERVAL", 30))   # detik, maksimum
+
+lock_collection = db.scheduler_locks
+
+
+class Job:
+    def __init__(self, name: str, interval: float, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0        # bukan leader saat jadwal jatuh tempo
+        self.last_started_at = None
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started_at": self.last_started_at,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """Scheduler async in-app dengan leader election per job.
+
+    Setiap worker menjalankan loop yang sama, tapi sebelum job dijalankan
+    worker harus memegang dokumen lock di ``scheduler_locks``. Lock punya
+    masa berlaku, jadi kalau pemegangnya mati worker lain mengambil alih.
+    """
+
+    def __init__(self, collection=lock_collection):
+        self.collection = collection
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs = {}
+        self._tasks = []
+
+    def job(self, name: str, interval: float):
+        def decorator(func):
+            self.jobs[name] = Job(name, interval, func)
+            return func
+        return decorator
+
+    async def acquire(self, name: str, ttl: float) -> bool:
+        now = datetime.utcnow()
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl), "acquired_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Dokumen lock ada dan masih dipegang worker lain
+            return False
+        return doc is not None and doc.get("owner") == self.owner
+
+    async def renew(self, name: str, ttl: float) -> bool:
+        # Hanya pemegang lock yang bisa memperpanjang; False berarti lock sudah diambil worker lain
+        result = await self.collection.update_one(
+            {"_id": name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=ttl)}},
+        )
+        return result.matched_count == 1
+
+    async def release(self, name: str):
+        await self.collection.update_one(
+            {"_id": name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow()}},
+        )
+
+    async def run_once(self, job: Job):
+        # Lock dipegang selama satu interval supaya worker lain tidak menjalankan
+        # job yang sama di jadwal berikutnya sebelum waktunya, dan diperpanjang
+        # selama job masih berjalan (purge besar bisa lebih lama dari interval).
+        if not await self.acquire(job.name, ttl=job.interval):
+            job.skipped += 1
+            return
+        job.last_started_at = datetime.utcnow()
+        started = time.perf_counter()
+        work = asyncio.ensure_future(job.func())
+        keeper = asyncio.create_task(self._keep_lease(job, work))
+        try:
+            job.last_result = await work
+            job.last_error = None
+            job.runs += 1
+        except asyncio.CancelledError:
+            if not (keeper.done() and keeper.result()):
+                raise   # scheduler dihentikan
+            # Lock hilang: worker lain sudah memegangnya, jangan jalan bersamaan
+            job.failures += 1
+            job.last_error = "lock diambil worker lain"
+        except Exception as e:
+            job.failures += 1
+            job.last_error = repr(e)
+            logger.exception("Job %s gagal", job.name)
+            # job gagal: lepas lock supaya worker lain bisa mencoba lagi
+            await self.release(job.name)
+        finally:
+            keeper.cancel()
+            job.last_duration = time.perf_counter() - started
+            logger.info("Job %s selesai dalam %.1f ms", job.name, job.last_duration * 1000)
+
+    async def _keep_lease(self, job: Job, work) -> bool:
+        # Heartbeat expires_at selama job berjalan; kembalikan True kalau lock hilang
+        every = min(job.interval / 3, SCHEDULER_LEASE_RENEW_INTERVAL)
+        while True:
+            await asyncio.sleep(every)
+            if work.done():
+                return False
+            try:
+                renewed = await self.renew(job.name, ttl=job.interval)
+            except Exception:
+                # MongoDB sesaat tidak bisa dihubungi: coba lagi di heartbeat berikutnya
+                logger.exception("Gagal memperpanjang lock job %s", job.name)
+                continue
+            if not renewed:
+                logger.warning("Lock job %s diambil worker lain; job dihentikan", job.name)
+                work.cancel()
+                return True
+
+    async def _loop(self, job: Job):
+        while True:
+            try:
+                await self.run_once(job)
+            except Exception:
+                logger.exception("Scheduler gagal menjalankan %s", job.name)
+            await asyncio.sleep(job.interval)
+
+    async def start(self):
+        if self._tasks:
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {"owner": self.owner, "jobs": {name: job.stats() for name, job in self.jobs.items()}}
+
+
+# === Helper batch ===
+
+async def batched_update_many(collection, filter: dict, update, batch_size: int = None, pause: float = None):
+    # Ambil _id per batch lalu update_many per batch, dengan jeda antar batch
+    # supaya purge besar tidak menghabiskan IO dan lock MongoDB sekaligus.
+    # `update` harus membuat dokumen tidak lagi cocok dengan `filter`.
+    batch_size = batch_size or SCHEDULER_BATCH_SIZE
+    pause = SCHEDULER_BATCH_PAUSE if pause is None else pause
+    total = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(filter, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return total
+        # filter diulang supaya dokumen yang berubah sejak find() tidak ikut tersentuh
+        result = await collection.update_many({"$and": [{"_id": {"$in": ids}}, filter]}, update)
+        total += result.modified_count
+        if len(ids) < batch_size:
+            return total
+        await asyncio.sleep(pause)
+
+
+async def batched_delete_many(collection, filter: dict, batch_size: int = None, pause: float = None):
+    batch_size = batch_size or SCHEDULER_BATCH_SIZE
+    pause = SCHEDULER_BATCH_PAUSE if pause is None else pause
+    total = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(filter, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return total
+        result = await collection.delete_many({"$and": [{"_id": {"$in": ids}}, filter]})
+        total += result.deleted_count
+        if len(ids) < batch_size:
+            return total
+        await asyncio.sleep(pause)
+
+
+scheduler = Scheduler()
@@ -0,0 +1,101 @@
+import asyncio
+import copy
+import os
+
+from bson import json_util
+
+# === Konfigurasi ===
+# SINGLEFLIGHT_SCOPE:
+#   "off"        -> tidak ada penggabungan, setiap request query sendiri
+#   "reference"  -> hanya koleksi di SINGLEFLIGHT_COLLECTIONS (default)
+#   "all"        -> semua koleksi yang lewat helper ini
+SINGLEFLIGHT_SCOPE = os.getenv("SINGLEFLIGHT_SCOPE", "reference").lower()
+SINGLEFLIGHT_COLLECTIONS = {
+    name.strip()
+    for name in os.getenv("SINGLEFLIGHT_COLLECTIONS", "fakultas,prodi").split(",")
+    if name.strip()
+}
+
+
+class SingleFlight:
+    """Membagi satu query yang sedang berjalan ke semua request identik.
+
+    Hanya query yang *sedang berjalan* yang dibagi; begitu selesai, key
+    langsung dilepas sehingga request berikutnya selalu query ulang
+    (tidak ada data basi yang disajikan).
+    """
+
+    def __init__(self, scope: str = SINGLEFLIGHT_SCOPE, collections: set = None):
+        self.scope = scope
+        self.collections = set(collections if collections is not None else SINGLEFLIGHT_COLLECTIONS)
+        self._inflight = {}
+        self._generation = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    def enabled_for(self, collection_name: str) -> bool:
+        if self.scope == "off":
+            return False
+        if self.scope == "all":
+            return True
+        return collection_name in self.collections
+
+    def invalidate(self, collection_name: str):
+        # Dipanggil setelah write: request berikutnya tidak boleh menumpang
+        # query yang dimulai sebelum write selesai.
+        self._generation[collection_name] = self._generation.get(collection_name, 0) + 1
+
+    def make_key(self, op: str, collection_name: str, filter: dict, projection=None):
+        return (
+            op,
+            collection_name,
+            self._generation.get(collection_name, 0),
+            json_util.dumps(filter or {}, sort_keys=True),
+            json_util.dumps(projection, sort_keys=True),
+        )
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            # query dijalankan sebagai task terpisah supaya request yang dibatalkan
+            # (client disconnect) tidak ikut membatalkan query milik request lain
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executed += 1
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        result = await asyncio.shield(task)
+        # setiap pemanggil dapat salinan sendiri karena route sering memodifikasi dokumen
+        return copy.deepcopy(result)
+
+    def stats(self) -> dict:
+        total = self.executed + self.collapsed
+        return {
+            "scope": self.scope,
+            "collections": sorted(self.collections),
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "collapse_ratio": round(self.collapsed / total, 4) if total else 0.0,
+            "inflight": len(self._inflight),
+        }
+
+
+singleflight = SingleFlight()
+
+
+# === Helper untuk akses data ===
+
+async def coalesced_find_one(collection, filter: dict, projection: dict = None):
+    if not singleflight.enabled_for(collection.name):
+        return await collection.find_one(filter, projection)
+    key = singleflight.make_key("find_one", collection.name, filter, projection)
+    return await singleflight.do(key, lambda: collection.find_one(filter, projection))
+
+
+async def coalesced_find(collection, filter: dict = None, projection: dict = None):
+    filter = filter or {}
+    if not singleflight.enabled_for(collection.name):
+        return await collection.find(filter, projection).to_list(length=None)
+    key = singleflight.make_key("find", collection.name, filter, projection)
+    return await singleflight.do(key, lambda: collection.find(filter, projection).to_list(length=None))
@@ -0,0 +1,325 @@
+import asyncio
+import itertools
+import logging
+import os
+import sys
+
+from pymongo import ASCENDING, TEXT, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+# Text index bersifat opsional: MongoDB hanya mengizinkan satu text index per koleksi
+USER_TEXT_INDEX = os.getenv("USER_TEXT_INDEX", "1") == "1"
+
+SORT_FIELDS = {
+    "username": "username_lower",
+    "email": "email_lower",
+    "created": "_id",
+}
+
+# Setiap index diakhiri _id sebagai tie-breaker sort, jadi skip/limit stabil
+# dan MongoDB tidak perlu SORT di memori.
+USER_INDEXES = [
+    IndexModel([("username_lower", ASCENDING), ("_id", ASCENDING)], name="username_lower_1__id_1"),
+    IndexModel([("email_lower", ASCENDING), ("_id", ASCENDING)], name="email_lower_1__id_1"),
+    IndexModel(
+        [("role", ASCENDING), ("username_lower", ASCENDING), ("_id", ASCENDING)],
+        name="role_1_username_lower_1__id_1",
+    ),
+    IndexModel(
+        [("role", ASCENDING), ("email_lower", ASCENDING), ("_id", ASCENDING)],
+        name="role_1_email_lower_1__id_1",
+    ),
+    IndexModel([("role", ASCENDING), ("_id", ASCENDING)], name="role_1__id_1"),
+]
+TEXT_INDEX = IndexModel([("username", TEXT), ("email", TEXT)], name="user_text")
+
+
+# === Normalisasi field ===
+
+def with_normalized_fields(data: dict) -> dict:
+    # Field *_lower disimpan saat write supaya pencarian case-insensitive
+    # dan prefix bisa memakai index biasa (tanpa regex /i yang tidak selektif).
+    if data.get("username") is not None:
+        data["username_lower"] = str(data["username"]).lower()
+    if data.get("email") is not None:
+        data["email_lower"] = str(data["email"]).lower()
+    return data
+
+
+def prefix_range(prefix: str) -> dict:
+    # Range [prefix, prefix+1) selalu menghasilkan index bound yang rapat,
+    # berbeda dengan regex yang bergantung pada karakter di dalam prefix.
+    prefix = prefix.lower()
+    # Karakter terakhir yang sudah maksimum (U+10FFFF) tidak bisa dinaikkan:
+    # carry ke karakter sebelumnya, atau tanpa batas atas kalau semuanya maksimum.
+    head = prefix.rstrip(chr(sys.maxunicode))
+    if not head:
+        return {"$gte": prefix}
+    code = ord(head[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000   # surrogate tidak bisa di-encode ke UTF-8/BSON
+    return {"$gte": prefix, "$lt": head[:-1] + chr(code)}
+
+
+# === Query builder ===
+
+def resolve_user_search(
+    username: str = None,
+    email: str = None,
+    role: str = None,
+    username_prefix: str = None,
+    email_prefix: str = None,
+    q: str = None,
+    sort_by: str = None,
+    skip: int = 0,
+) -> dict:
+    """Normalisasi parameter pencarian dan tolak kombinasi tanpa index.
+
+    Hanya kombinasi yang bisa dilayani index tanpa SORT di memori yang
+    diterima; sisanya ``ValueError``. Nilai ``sort_by`` yang dikembalikan
+    sudah terisi default, atau ``None`` untuk pencarian ``q``.
+    """
+    # Exact match mengalahkan prefix pada field yang sama
+    if username:
+        username_prefix = None
+    if email:
+        email_prefix = None
+
+    if q:
+        # Text index (atau $or prefix) tidak bisa digabung dengan index role/username/email,
+        # dan urutannya ditentukan skor relevansi.
+        if role or username or email or username_prefix or email_prefix:
+            raise ValueError("q tidak bisa digabung dengan filter role, username, atau email")
+        if sort_by is not None:
+            raise ValueError("q diurutkan berdasarkan relevansi; sort_by tidak didukung")
+        if skip and not USER_TEXT_INDEX:
+            # Fallback $or tidak punya urutan yang bisa dilayani index, jadi
+            # halaman berikutnya bisa mengulang atau melewatkan user.
+            raise ValueError("Tanpa text index, pencarian q hanya mendukung halaman pertama (skip=0)")
+    elif username_prefix and email_prefix:
+        raise ValueError("Hanya satu dari username_prefix atau email_prefix yang bisa dipakai")
+    elif username or email:
+        # Equality pada (field_lower, _id) sudah berurutan _id; prefix field lain jadi filter sisa
+        exact = [field for field, value in (("username", username), ("email", email)) if value]
+        if sort_by is None:
+            sort_by = exact[0]
+        elif sort_by not in (*exact, "created"):
+            raise ValueError(f"sort_by={sort_by} hanya didukung tanpa filter pada field lain")
+    elif username_prefix or email_prefix:
+        # Range prefix hanya berurutan menurut field itu sendiri
+        prefix_field = "username" if username_prefix else "email"
+        if sort_by is None:
+            sort_by = prefix_field
+        elif sort_by != prefix_field:
+            raise ValueError(f"Filter {prefix_field}_prefix hanya bisa diurutkan berdasarkan {prefix_field}")
+    elif sort_by is None:
+        sort_by = "created"
+
+    return {
+        "username": username,
+        "email": email,
+        "role": role,
+        "username_prefix": username_prefix,
+        "email_prefix": email_prefix,
+        "q": q,
+        "sort_by": sort_by,
+    }
+
+
+def build_user_search(
+    username: str = None,
+    email: str = None,
+    role: str = None,
+    username_prefix: str = None,
+    email_prefix: str = None,
+    q: str = None,
+    sort_by: str = None,
+    sort_order: int = 1,
+    skip: int = 0,
+):
+    params = resolve_user_search(
+        username=username,
+        email=email,
+        role=role,
+        username_prefix=username_prefix,
+        email_prefix=email_prefix,
+        q=q,
+        sort_by=sort_by,
+        skip=skip,
+    )
+    query = {}
+    projection = None
+
+    if params["role"]:
+        query["role"] = params["role"]
+    # Exact match tetap exact, tapi lewat field lower yang ter-index
+    if params["username"]:
+        query["username_lower"] = params["username"].lower()
+        query["username"] = params["username"]
+    elif params["username_prefix"]:
+        query["username_lower"] = prefix_range(params["username_prefix"])
+    if params["email"]:
+        query["email_lower"] = params["email"].lower()
+        query["email"] = params["email"]
+    elif params["email_prefix"]:
+        query["email_lower"] = prefix_range(params["email_prefix"])
+
+    if params["q"]:
+        if USER_TEXT_INDEX:
+            query["$text"] = {"$search": params["q"]}
+            projection = {"score": {"$meta": "textScore"}}
+            # Skor sama diurutkan _id supaya paginasi stabil
+            return query, projection, [("score", {"$meta": "textScore"}), ("_id", 1)]
+        # Tanpa text index: OR dua range prefix, urutan mengikuti plan (tanpa SORT);
+        # karena itu resolve_user_search hanya mengizinkan halaman pertama.
+        query["$or"] = [
+            {"username_lower": prefix_range(params["q"])},
+            {"email_lower": prefix_range(params["q"])},
+        ]
+        return query, projection, None
+
+    sort_by = params["sort_by"]
+    sort = [(SORT_FIELDS[sort_by], sort_order)]
+    if sort_by != "created":
+        # tie-breaker supaya paginasi skip/limit stabil
+        sort.append(("_id", sort_order))
+
+    return query, projection, sort
+
+
+# === Setup index ===
+
+async def ensure_user_indexes(collection):
+    indexes = list(USER_INDEXES)
+    if USER_TEXT_INDEX:
+        indexes.append(TEXT_INDEX)
+    await collection.create_indexes(indexes)
+
+
+async def backfill_normalized_fields(collection, batch_size: int = 1000, pause: float = 0.05):
+    # Dokumen lama belum punya field *_lower; isi secara bertahap
+    total = 0
+    while True:
+        ids = [
+            doc["_id"]
+            async for doc in collection.find(
+                {"$or": [{"username_lower": {"$exists": False}}, {"email_lower": {"$exists": False}}]},
+                {"_id": 1},
+            ).limit(batch_size)
+        ]
+        if not ids:
+            break
+        result = await collection.update_many(
+            {"_id": {"$in": ids}},
+            [{"$set": {
+                "username_lower": {"$toLower": "$username"},
+                "email_lower": {"$toLower": "$email"},
+            }}],
+        )
+        total += result.modified_count
+        await asyncio.sleep(pause)
+    if total:
+        logger.info("Backfill username_lower/email_lower: %d user", total)
+    return total
+
+
+# === Verifikasi index lewat explain() ===
+
+_SHAPE_SAMPLES = {
+    "role": [None, "admin"],
+    "username": [None, "John Doe"],
+    "email": [None, "john@example.com"],
+    "username_prefix": [None, "jo"],
+    "email_prefix": [None, "jo"],
+    "q": [None, "john"],
+    "sort_by": [None, *SORT_FIELDS],
+}
+
+
+def _supported_shapes() -> dict:
+    # Setiap kombinasi yang diterima resolve_user_search (dan jadi dipakai get_users);
+    # kombinasi yang ternormalisasi ke bentuk yang sama hanya dicatat sekali.
+    shapes = {}
+    seen = set()
+    for values in itertools.product(*_SHAPE_SAMPLES.values()):
+        params = {key: value for key, value in zip(_SHAPE_SAMPLES, values) if value is not None}
+        try:
+            resolved = tuple(resolve_user_search(**params).items())
+        except ValueError:
+            continue
+        if resolved in seen:
+            continue
+        seen.add(resolved)
+        name = "+".join(key if key != "sort_by" else f"sort_by={value}" for key, value in params.items())
+        shapes[name or "all"] = params
+    return shapes
+
+
+SUPPORTED_SHAPES = _supported_shapes()
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def explain_user_search(collection, limit: int = 10, max_examined_ratio: float = 4.0) -> dict:
+    """Jalankan explain() untuk setiap bentuk query yang diterima ``get_users``.
+
+    Shape ditandai ``ok: False`` kalau winning plan memakai COLLSCAN, SORT
+    in-memory, atau memeriksa key/dokumen jauh lebih banyak (lebih dari
+    ``max_examined_ratio`` kali) dibanding hasil yang dikembalikan.
+    """
+    report = {}
+    for name, params in SUPPORTED_SHAPES.items():
+        query, projection, sort = build_user_search(**params)
+        cursor = collection.find(query, projection).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        # Verbosity default explain (allPlansExecution) menyertakan executionStats
+        plan = await cursor.explain()
+        winning = plan["queryPlanner"]["winningPlan"]
+        winning = winning.get("queryPlan", winning)  # format SBE
+        stages = [s for s in _stages(winning) if s]
+        stats = plan.get("executionStats", {})
+        returned = stats.get("nReturned", 0)
+        examined = max(stats.get("totalKeysExamined", 0), stats.get("totalDocsExamined", 0))
+
+        problems = []
+        if "COLLSCAN" in stages:
+            problems.append("COLLSCAN")
+        # Text search harus menilai semua dokumen yang cocok lalu sort skor di
+        # memori; itu satu-satunya pengecualian, dan hanya kalau $text dipakai.
+        uses_text = "$text" in query
+        if "SORT" in stages and not uses_text:
+            problems.append("SORT in-memory")
+        if not uses_text and examined > max_examined_ratio * max(returned, 1):
+            problems.append(f"examined {examined} untuk {returned} hasil")
+        report[name] = {
+            "stages": stages,
+            "returned": returned,
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "problems": problems,
+            "ok": not problems,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    from database import users_collection
+
+    async def _main():
+        await ensure_user_indexes(users_collection)
+        report = await explain_user_search(users_collection)
+        print(json.dumps(report, indent=2))
+        if not all(r["ok"] for r in report.values()):
+            raise SystemExit(1)
+
+    asyncio.run(_main())